@@ -1,14 +1,24 @@
 #This script is used to analyse data
 #It needs the transcripts generated by string_matching, keywords cleaned file generated by both keywords_database and keywords_factoscope and metadata file generated by xmlExtractor
+#The metadata can also be read from the SQLite database written by xmlExtractor with --database
 #It will display bar graphs but can be used to process data as well
 
 import argparse
 import json
 import matplotlib.pyplot as plt
 from src.analytics import Analytics
+from src.metadata_store import MetadataStore
 
 
-def main(data_path, keywords_path, metadata_path):
+def load_json(file_path):
+    # Jsonl files, such as the metadata streamed by xmlExtractor, hold one record per line
+    with open(file_path, 'r', encoding='UTF-8') as file:
+        if file_path.endswith('.jsonl'):
+            return [json.loads(line) for line in file if line.strip()]
+        return json.load(file)
+
+
+def main(data_path, keywords_path, metadata_path, database_path=None):
     # Importing the data needed for processing
     print('[-] Importing data')
     with open(data_path, 'r', encoding='UTF-8') as file:
@@ -17,11 +27,16 @@ def main(data_path, keywords_path, metadata_path):
     with open(keywords_path, 'r', encoding='UTF-8') as file:
         keywords = json.load(file)
 
-    with open(metadata_path, 'r', encoding='UTF-8') as file:
-        metadata = json.load(file)
+    # The database is queried for the rows needed instead of loading all the metadata
+    store = None
+    metadata = None
+    if database_path is not None:
+        store = MetadataStore(database_path)
+    else:
+        metadata = load_json(metadata_path)
 
     # Perform analytics on the imported data
-    analyser = Analytics(data, keywords, metadata)
+    analyser = Analytics(data, keywords, metadata, store)
     channels, data = analyser.analyse_keywords_per_day()
 
     # Display a graph based on the analytics
@@ -32,9 +47,12 @@ def main(data_path, keywords_path, metadata_path):
 parser = argparse.ArgumentParser(description='Generate analytics graphs')
 parser.add_argument('--data', help='Path to the data file', required=True)
 parser.add_argument('--keywords', help='Path to the keywords file', required=True)
-parser.add_argument('--metadata', help='Path to the metadata file', required=True)
+parser.add_argument('--metadata', help='Path to the metadata file')
+parser.add_argument('--database', help='Path to the SQLite database of the broadcasts, replaces --metadata')
 args = parser.parse_args()
+if args.metadata is None and args.database is None:
+    parser.error('one of --metadata or --database is required')
 
 # Run the main function
 if __name__ == "__main__":
-    main(args.data, args.keywords, args.metadata)
+    main(args.data, args.keywords, args.metadata, args.database)
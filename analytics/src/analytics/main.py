@@ -12,12 +12,14 @@ class Analytics:
         Parameters:
             data (list): List of data for each recording
             keywords (list): List of keywords for each recording
-            metadata (list): List of metadata for each recording
+            metadata (list): List of metadata for each recording, can be None if a store is given
+            store (MetadataStore, optional): Database of the broadcasts queried instead of the metadata list
     """
-    def __init__(self, data, keywords, metadata):
+    def __init__(self, data, keywords, metadata, store=None):
         self.data = data
         self.keywords = keywords
-        self.metadata = metadata
+        self.metadata = metadata if metadata is not None else []
+        self.store = store
         self._pre_process()
 
     """
@@ -48,6 +50,24 @@ class Analytics:
         for emission in self.data:
             self.data_per_file[self._normalize_path(emission['file'])] = emission
 
+    """
+        Returns the channel and the category of the broadcast recorded in the folder of a file
+
+        Parameters:
+            file_path (str): The path of the file
+
+        Returns:
+            str, str: The channel and the category of the broadcast
+    """
+    def _get_channel_and_category(self, file_path):
+        folder = self._normalize_path(file_path)
+        if self.store is None:
+            emission = self.metadata_per_file[folder]
+            return self._get_channel(emission), self._get_category(emission)
+        broadcast = self.store.get(folder)
+        if broadcast is None: return None, None
+        return broadcast['channel'], broadcast['category']
+
     """
         Returns the channel of the emission
 
@@ -68,6 +88,7 @@ class Analytics:
             list: The list of recorded channels
     """
     def get_channels(self):
+        if self.store is not None: return self.store.channels()
         channels = set()
         for emission in self.metadata:
             channels.add(self._get_channel(emission))
@@ -96,6 +117,7 @@ class Analytics:
             list: The list of recorded categories
     """
     def get_categories(self):
+        if self.store is not None: return self.store.categories()
         categories = set()
         for emission in self.metadata:
             categories.add(self._get_category(emission))
@@ -287,7 +309,7 @@ class Analytics:
 
         # Iterate through the data and count the occurences of keywords in each channel
         for emission in self.data:
-            file_channel = self._get_channel(self.metadata_per_file[self._normalize_path(emission['file'])])
+            file_channel = self._get_channel_and_category(emission['file'])[0]
             if file_channel is not None:
                 index_in_channels = list(channels).index(file_channel)
                 for keyword in keywords:
@@ -325,7 +347,7 @@ class Analytics:
         # Loop through each emission in self.data
         for emission in self.data:
             # Get the category of the emission
-            file_category = self._get_category(self.metadata_per_file[self._normalize_path(emission['file'])])
+            file_category = self._get_channel_and_category(emission['file'])[1]
 
             # If the category is not None, update keyword occurences for the category
             if file_category is not None:
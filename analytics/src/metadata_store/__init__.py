@@ -0,0 +1 @@
+from .main import MetadataStore
\ No newline at end of file
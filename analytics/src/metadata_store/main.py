@@ -0,0 +1,79 @@
+import sqlite3
+
+
+class MetadataStore:
+    """
+        Read access to the SQLite database of the broadcasts written by xmlExtractor with --database.
+
+        Parameters:
+            db_path (str): Path of the SQLite database
+    """
+    def __init__(self, db_path):
+        # Opened read only so a missing database is an error instead of an empty one
+        self.connection = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+        self.connection.row_factory = sqlite3.Row
+
+    """
+        Returns the broadcast recorded in a folder
+
+        Parameters:
+            folder (str): The normalised path of the folder
+
+        Returns:
+            dict: The broadcast with its channel, category, date, hour, title, desc and file, None if it is unknown
+    """
+    def get(self, folder):
+        row = self.connection.execute('SELECT * FROM broadcasts WHERE folder = ?', (folder,)).fetchone()
+        return dict(row) if row is not None else None
+
+    """
+        Returns the list of recorded channels
+
+        Returns:
+            set: The recorded channels
+    """
+    def channels(self):
+        rows = self.connection.execute('SELECT DISTINCT channel FROM broadcasts WHERE channel IS NOT NULL')
+        return {row[0] for row in rows}
+
+    """
+        Returns the list of recorded categories
+
+        Returns:
+            set: The recorded categories
+    """
+    def categories(self):
+        rows = self.connection.execute('SELECT DISTINCT category FROM broadcasts WHERE category IS NOT NULL')
+        return {row[0] for row in rows}
+
+    """
+        Returns the broadcasts matching every given filter, using the indexes of the database
+
+        Parameters:
+            channel (str, optional): The channel of the broadcasts
+            category (str, optional): The category of the broadcasts
+            start_date (str, optional): The first date included, as YYYYMMDD
+            end_date (str, optional): The last date included, as YYYYMMDD
+
+        Returns:
+            list: The broadcasts as dicts, ordered by date and hour
+    """
+    def query(self, channel=None, category=None, start_date=None, end_date=None):
+        conditions = []
+        parameters = []
+        for condition, parameter in (('channel = ?', channel), ('category = ?', category),
+                                     ('date >= ?', start_date), ('date <= ?', end_date)):
+            if parameter is not None:
+                conditions.append(condition)
+                parameters.append(parameter)
+        request = 'SELECT * FROM broadcasts'
+        if conditions:
+            request += ' WHERE ' + ' AND '.join(conditions)
+        rows = self.connection.execute(request + ' ORDER BY date, hour', parameters)
+        return [dict(row) for row in rows]
+
+    """
+        Closes the database
+    """
+    def close(self):
+        self.connection.close()
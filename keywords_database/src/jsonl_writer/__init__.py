@@ -0,0 +1,2 @@
+from .main import JsonlWriter
+from .main import read_jsonl
\ No newline at end of file
@@ -0,0 +1,62 @@
+import json
+
+
+class JsonlWriter:
+    """
+        Initializes the JsonlWriter class, writing one json record per line.
+        The output file is created or emptied, then records are only appended to it.
+
+        :param output_file: path of the jsonl file
+        :param buffer_size: number of records kept in memory before being written, default is 1000
+    """
+    def __init__(self, output_file, buffer_size=1000):
+        self.output_file = output_file
+        self.buffer_size = buffer_size
+        self.buffer = []  # Lines waiting to be written
+        self.count = 0  # Number of records written
+        self.file = open(output_file, 'w', encoding='UTF-8')
+
+    """
+        Adds a record, the buffer is written once it holds buffer_size records.
+
+        :param record: json serializable record
+    """
+    def write(self, record):
+        self.buffer.append(json.dumps(record, ensure_ascii=False) + '\n')
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    """
+        Appends the buffered records to the output file.
+    """
+    def flush(self):
+        if self.buffer:
+            self.file.write(''.join(self.buffer))
+            self.count += len(self.buffer)
+            self.buffer = []
+        self.file.flush()  # So an interrupted run keeps every record already flushed
+
+    """
+        Writes the remaining records and closes the output file.
+    """
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+"""
+    Yields the records of a jsonl file one by one, without loading the whole file.
+
+    :param input_file: path of the jsonl file
+"""
+def read_jsonl(input_file):
+    with open(input_file, 'r', encoding='UTF-8') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
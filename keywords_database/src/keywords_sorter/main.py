@@ -4,7 +4,7 @@ class KeywordSorter:
     """
     Initializes the KeywordSorter class with the keywords dictionary.
 
-    :param keywords_dict: the keywords dictionary
+    :param keywords_dict: the keywords dictionary, any iterable of dicts with a text field, read only once
     """
     def __init__(self, keywords_dict):
         self.keywords_dict = keywords_dict
@@ -1,5 +1,7 @@
+import json
+import os
 import xml.etree.ElementTree as ET
-from os import listdir, path
+from os import path, scandir
 
 
 class PathFinder:
@@ -7,29 +9,53 @@ class PathFinder:
         Initializes the PathFinder class with the base path.
 
         :param base_path: path to the database
+        :param manifest: optional json file keeping the folder tree between runs, default is None
     """
-    def __init__(self, base_path):
+    def __init__(self, base_path, manifest=None):
         self.base_path = base_path  # Assign the base path to an instance variable
         self.paths = set()  # Initialize an empty set to store paths
+        self.manifest = manifest  # Path of the manifest, None disables it
 
     """
         Returns all the folders in the current folder path.
 
         :param current_folder: current folder path
-        :param folders_and_files: list of folders and files in the current folder path
     """
-    def _list_dirs(self, current_folder, folders_and_files):
-        folders = set()  # Initialize an empty set to store folders
-        for element in folders_and_files:
-            # For each element in the folder_and_files list
-            current_path = path.join(current_folder, element)  # Join the current folder path with the element name
-            if path.isdir(current_path):  # Check if the current path is a directory
-                folders.add(current_path)  # Add it to the folders set if it's a directory
+    def _list_dirs(self, current_folder):
+        folders = []  # Initialize an empty list to store folders
+        with scandir(current_folder) as elements:
+            for element in elements:
+                # The directory entry already knows its type, no stat is needed
+                if element.is_dir():
+                    folders.append(element.path)  # Add it to the folders list if it's a directory
 
         return folders
 
     """
-        Visit every folder recursively until there are no more folders.
+        Loads the folders saved in the manifest by a previous run from the same base path.
+    """
+    def _load_manifest(self):
+        if self.manifest is None or not path.isfile(self.manifest):
+            return {}  # No manifest to start from
+        with open(self.manifest, 'r', encoding='UTF-8') as file:
+            content = json.load(file)
+        if content.get('base_path') != self.base_path:
+            return {}  # The manifest was made for another database
+        return content['folders']
+
+    """
+        Saves the folder tree in the manifest through a temporary file.
+
+        :param folders: dict of folder -> [modification time, subfolders]
+    """
+    def _save_manifest(self, folders):
+        temporary_file = f'{self.manifest}.tmp'
+        with open(temporary_file, 'w', encoding='UTF-8') as file:
+            json.dump({"base_path": self.base_path, "folders": folders}, file, ensure_ascii=False)
+        os.replace(temporary_file, self.manifest)  # Replacing the manifest only once it is fully written
+
+    """
+        Visit every folder until there are no more folders.
 
         :param starting_point: starting point for the search, default is None
     """
@@ -37,15 +63,25 @@ class PathFinder:
         if starting_point is None:
             starting_point = self.base_path  # If starting point is None, set it to base_path
 
-        folders = self._list_dirs(starting_point, listdir(starting_point))  # Get all the folders in the current path
-        if len(folders) == 0:
-            self.paths.add(starting_point)  # If there are no more folders, add the starting point to the paths set
-            return
-
-        for folder in folders:
-            # For each folder in the current path
-            next_path = path.join(starting_point, folder)  # Join the starting point with the folder name
-            self.run_finder(starting_point=next_path)  # Recursively call the function for the next folder
+        known_folders = self._load_manifest()  # Folders of the previous run
+        folders = {}
+        to_visit = [starting_point]  # Iterative walk so deep trees cannot reach the recursion limit
+        while to_visit:
+            current_folder = to_visit.pop()
+            modification_time = os.stat(current_folder).st_mtime_ns
+            known = known_folders.get(current_folder)
+            if known is not None and known[0] == modification_time:
+                subfolders = known[1]  # Unchanged folder, reusing the previous listing
+            else:
+                subfolders = self._list_dirs(current_folder)  # Get all the folders in the current path
+            folders[current_folder] = [modification_time, subfolders]
+
+            if len(subfolders) == 0:
+                self.paths.add(current_folder)  # If there are no more folders, add the folder to the paths set
+            to_visit.extend(subfolders)
+
+        if self.manifest is not None:
+            self._save_manifest(folders)
 
 
 class TextExtractor:
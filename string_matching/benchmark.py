@@ -0,0 +1,120 @@
+# This script is used to compare the keyword matching backends of string_matching
+# It generates deterministic synthetic French transcripts with near-miss spellings and a keyword list
+# It will save the throughput, per-file latency percentiles, peak memory and precision/recall against the
+# fuzzywuzzy baseline of every backend in a json file
+
+import argparse
+import json
+import queue
+from multiprocessing import Process, Queue
+
+from src.benchmark import generate_corpus, run_backend, BACKENDS
+from src.matcher import tokenize
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, the peak memory is not reported
+    resource = None
+
+
+def peak_rss():
+    """Returns the peak resident memory in MB of this process"""
+    if resource is None:
+        return None
+    # ru_maxrss is in KB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def percentile(values, rank):
+    """Returns the nearest-rank percentile of a list of values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(rank / 100 * len(ordered))) - 1))]
+
+
+def run(name, transcripts, keywords, output):
+    """Runs one backend in its own process so the peak memory of every backend is measured separately"""
+    setup, durations, counts = run_backend(name, transcripts, keywords)
+    output.put({"backend": name, "setup": setup, "durations": durations, "counts": counts, "peak_rss_mb": peak_rss()})
+
+
+def accuracy(counts, reference):
+    """Returns the precision and recall of keyword counts per file against reference counts"""
+    found = expected = correct = 0
+    for file_counts, reference_counts in zip(counts, reference):
+        for keyword in set(file_counts) | set(reference_counts):
+            count, reference_count = file_counts.get(keyword, 0), reference_counts.get(keyword, 0)
+            found += count
+            expected += reference_count
+            correct += min(count, reference_count)
+    precision = round(correct / found, 4) if found else None
+    recall = round(correct / expected, 4) if expected else None
+    return precision, recall
+
+
+def main(transcripts_count, words, keywords_count, near_miss_rate, seed, backends, output_file):
+    print('[-] Generating corpus')
+    transcripts, keywords = generate_corpus(transcripts_count, words, keywords_count, near_miss_rate, seed)
+    tokens = sum(len(tokenize(transcript["text"])) for transcript in transcripts)
+
+    runs = {}
+    for backend in backends:
+        print(f'[-] Running {backend}')
+        output = Queue()
+        process = Process(target=run, args=(backend, transcripts, keywords, output))
+        process.start()
+        # Waiting for the result as long as the backend is running
+        while True:
+            try:
+                runs[backend] = output.get(timeout=1)
+                break
+            except queue.Empty:
+                if not process.is_alive():
+                    print(f'[!] {backend} stopped without a result')
+                    break
+        process.join()
+
+    reference = runs.get('baseline')
+    results = []
+    for backend, result in runs.items():
+        durations = result["durations"]
+        total = result["setup"] + sum(durations)
+        precision, recall = accuracy(result["counts"], reference["counts"]) if reference else (None, None)
+        results.append({
+            "backend": backend,
+            "setup_seconds": round(result["setup"], 4),
+            "total_seconds": round(total, 4),
+            "throughput": round(tokens * len(keywords) / total) if total else None,
+            "latency_ms": {f"p{rank}": round(percentile(durations, rank) * 1000, 3) for rank in (50, 90, 99)},
+            "peak_rss_mb": result["peak_rss_mb"],
+            "occurrences": sum(sum(counts.values()) for counts in result["counts"]),
+            "precision": precision,
+            "recall": recall
+        })
+
+    print('[-] Saving results')
+    with open(output_file, 'w', encoding='UTF-8') as file:
+        json.dump({
+            "config": {"transcripts": transcripts_count, "words": words, "keywords": len(keywords),
+                       "near_miss_rate": near_miss_rate, "seed": seed, "tokens": tokens},
+            "results": results
+        }, file, ensure_ascii=False, indent=2)
+    for result in results:
+        print(f"{result['backend']:>15} : {result['throughput']} tokens.keywords/s, latency {result['latency_ms']}, "
+              f"{result['peak_rss_mb']} MB, precision {result['precision']}, recall {result['recall']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmarks the keyword matching backends on a synthetic corpus')
+    parser.add_argument('--transcripts', help='Number of synthetic transcripts', type=int, default=10)
+    parser.add_argument('--words', help='Number of words of every transcript', type=int, default=1000)
+    parser.add_argument('--keywords', help='Number of keywords', type=int, default=100)
+    parser.add_argument('--near-miss', help='Share of misspelled words', type=float, default=0.1)
+    parser.add_argument('--seed', help='Seed of the corpus generator', type=int, default=0)
+    parser.add_argument('--backends', help='Backends to run, precision and recall need the baseline', nargs='+',
+                        choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument('--output', help='Output path of the json file', default='benchmark.json')
+    args = parser.parse_args()
+    main(args.transcripts, args.words, args.keywords, args.near_miss, args.seed, args.backends, args.output)
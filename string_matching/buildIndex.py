@@ -0,0 +1,43 @@
+# This script is used to build an inverted index of the words of every transcript
+# It needs the transcript file generated by transcripts
+# It will generate a directory containing every word with its occurrences (file, word index and
+# character offset) in a binary layout which can be memory-mapped, so new keyword lists can be
+# looked up with src.inverted_index.InvertedIndex without matching the transcripts again
+
+import argparse
+import json
+import time
+from progress.bar import Bar
+from src.inverted_index import IndexBuilder
+
+
+def main(transcript_path, output_dir):
+    start_time = time.perf_counter()
+    print('[-] Importing data')
+    with open(transcript_path, 'r', encoding='UTF-8') as file:
+        transcripts = json.load(file)
+
+    print('[-] Indexing transcripts')
+    builder = IndexBuilder(output_dir)
+    with Bar('Processing', max=len(transcripts)) as bar:
+        for transcript in transcripts:
+            builder.add(transcript["file"], transcript["text"])
+            bar.next()
+        bar.finish()
+
+    print('[-] Saving index')
+    terms, occurrences = builder.save()
+    end_time = time.perf_counter()
+
+    print(f'[-] {terms} terms, {occurrences} occurrences')
+    print("Duration:", end_time - start_time, "seconds")
+
+
+if __name__ == "__main__":
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Builds an inverted index of the transcripts')
+    parser.add_argument('--transcript', help='Path of the transcripts file', required=True)
+    parser.add_argument('--output', help='Directory of the index', default='index')
+    args = parser.parse_args()
+
+    main(args.transcript, args.output)
@@ -7,10 +7,19 @@
 import argparse
 import json
 import os
-import re
 import time
-from fuzzywuzzy import fuzz
+from array import array
+from bisect import bisect_right
+from multiprocessing import Pool
 from progress.bar import Bar
+from src.lemma_matcher import LemmaMatcher, compare_counts
+from src.matcher import KeywordIndex, tokenize
+from src.phrases import PhraseMatcher
+from src.spot_store import SpotStoreWriter
+from src.vocabulary import Vocabulary, init_scorer
+
+# Keyword structures of the current process, built once per worker by init_worker
+worker = {}
 
 
 def generate_empty_keywords_dict(keywords):
@@ -31,82 +40,253 @@ def generate_keywords_ids(keywords):
     return temp_dict
 
 
-def generate_output(transcript, transcriptTab, keywords, keyword_ids):
-    """Generates the final output containing keyword occurrences in the transcript"""
+def generate_output(transcript, transcriptTab, keywords, keyword_ids, index, starts, phrases=None):
+    """
+    Generates the final output containing keyword occurrences in the transcript.
+    transcriptTab holds the words of the transcript for a KeywordIndex, or their ids for a Vocabulary,
+    and starts the start offset of each word in the text.
+    With a PhraseMatcher, the exact occurrences of a keyword are used and fuzzy matching is only
+    a fallback for the keywords without any.
+
+    Every occurrence is saved as [keyword id, keyword, start offset, score, word, end offset, word index]
+    """
     current_data = {
         "file": transcript['file']
     }
-    occurences_dict = generate_empty_keywords_dict(keywords)
+    exact = phrases.find(transcript["text"]) if phrases else {}
+    # Searching for keyword occurences in text with 90% confidence, only scoring indexed candidates
+    matches = index.match(transcriptTab)
     data = []
     for keyword in keywords:
-        # Searching for keyword occurence in text with 90% confidence
-        results = []
-        for word in transcriptTab:
-            score = fuzz.token_set_ratio(keyword, word)
-            if score >= 90:
-                results.append((word, score))
-
-        if len(results) > 0:
-            position = -1
-            for i, result in enumerate(results):
-                word, score = result
-                position = transcript["text"].find(word, position + 1)
-                data.append([keyword_ids[keyword], keyword, position, score, word])
+        if keyword in exact:
+            for start, end in exact[keyword]:
+                # Word where the occurrence starts
+                position = max(bisect_right(starts, start) - 1, 0)
+                data.append([keyword_ids[keyword], keyword, start, 100, transcript["text"][start:end], end,
+                             position])
+            current_data['keywords'] = data
+            continue
+
+        for position, word, score in matches.get(keyword, []):
+            start = starts[position]
+            data.append([keyword_ids[keyword], keyword, start, score, word, start + len(word), position])
         current_data['keywords'] = data
 
     return current_data
 
 
-def main(transcript_path, keywords_path):
-    """Main function which calls other functions to process transcripts and count keyword occurrences"""
-    print('[-] Importing data')
-    # Loading data needed
-    with open(keywords_path, 'r', encoding='UTF-8') as file:
-        keywords = json.load(file)
+def generate_lemma_output(transcript, keywords, keyword_ids, lemma_matcher):
+    """
+    Generates the output containing the keywords found among the lemmas of the transcript.
+    Lemmas have no offset in the text, every occurrence is saved as
+    [keyword id, keyword, None, 100, lemma, None, lemma index], the index of the first lemma for a keyword
+    of several words
+    """
+    current_data = {
+        "file": transcript['file']
+    }
+    matches = lemma_matcher.match(transcript.get("lemmas", []))
+    data = []
+    for keyword in keywords:
+        for position in matches.get(keyword, []):
+            data.append([keyword_ids[keyword], keyword, None, 100, keyword, None, position])
+        current_data['keywords'] = data
 
-    with open(transcript_path, 'r', encoding='UTF-8') as file:
-        transcripts = json.load(file)
+    return current_data
 
-    keyword_ids = generate_keywords_ids(keywords)
-    print('[-] Generating statistics')
 
-    with Bar('Processing', max=len(transcripts)) as bar:
-        for transcript in transcripts:
-            start_time = time.perf_counter()
+def count_keywords(data):
+    """Counts the occurrences of every keyword in an output"""
+    counts = {}
+    for occurrence in data.get('keywords', []):
+        counts[occurrence[1]] = counts.get(occurrence[1], 0) + 1
+    return counts
+
+
+def init_worker(keywords, exact, vocabulary=None, modes=('fuzzy',), export_json=True, store=False):
+    """
+    Builds the keyword structures used by match_transcript in the current process for the matching modes,
+    the first one being written. A Vocabulary already scored replaces the KeywordIndex when given.
+    export_json writes the per-file JSON outputs and store sends the spots back for the spot store
+    """
+    worker['keywords'] = keywords
+    worker['keyword_ids'] = generate_keywords_ids(keywords)
+    worker['modes'] = modes
+    worker['export_json'] = export_json
+    worker['store'] = store
+    if 'fuzzy' in modes:
+        worker['matcher'] = vocabulary or KeywordIndex(keywords, score_cutoff=90)
+        worker['phrases'] = PhraseMatcher(keywords) if exact else None
+    if 'lemma' in modes:
+        worker['lemma_matcher'] = LemmaMatcher(keywords)
+
+
+def write_output(transcript, data):
+    """Writes the keyword occurrences of a transcript in the same hierarchy as the original database"""
+    file_path = transcript["file"]
+    timestamp = str(int(time.time()))
 
+    # Split the file path into directory and filename
+    directory, filename = os.path.split(file_path)
+
+    # Remove the "F:/" part from the directory
+    directory = directory[3:]
+
+    # Create the directory hierarchy if it does not exist
+    os.makedirs(directory, exist_ok=True)
+
+    # Write the JSON data to the file
+    with open(f"{directory}/{timestamp}_spot.json", "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def match_transcript(item):
+    """
+    Generates and writes the output of a (transcript, token ids, start offsets) item, the token ids and
+    offsets being None when the transcript is tokenized here.
+    Returns the processing duration, the keyword counts of each mode when several modes are compared,
+    and the spots of the first mode for the spot store
+    """
+    start_time = time.perf_counter()
+    transcript, tab, starts = item
+    outputs = []
+    for mode in worker['modes']:
+        if mode == 'lemma':
+            outputs.append(generate_lemma_output(transcript, worker['keywords'], worker['keyword_ids'],
+                                                 worker['lemma_matcher']))
+            continue
+
+        if tab is None:
             # Tokenize the string into words
-            tab = re.findall(r'\b\w+\b', transcript["text"])
+            tokens = tokenize(transcript["text"])
+            tab = [word for word, _, _ in tokens]
+            starts = [start for _, start, _ in tokens]
 
-            # Generate the output
-            data = generate_output(transcript, tab, keywords, keyword_ids)
+        # Generate the output
+        outputs.append(generate_output(transcript, tab, worker['keywords'], worker['keyword_ids'],
+                                       worker['matcher'], starts, worker['phrases']))
 
-            file_path = transcript["file"]
-            timestamp = str(int(time.time()))
+    if worker['export_json']:
+        write_output(transcript, outputs[0])
+    counts = [count_keywords(data) for data in outputs] if len(outputs) > 1 else None
+    spots = outputs[0].get('keywords', []) if worker['store'] else None
+    return time.perf_counter() - start_time, counts, spots
 
-            # Split the file path into directory and filename
-            directory, filename = os.path.split(file_path)
 
-            # Remove the "F:/" part from the directory
-            directory = directory[3:]
+def main(transcript_path, keywords_path, vocabulary=False, cache_dir=None, exact=False, workers=1,
+         chunk_size=16, mode='fuzzy', compare_path=None, store_path=None, export_json=False):
+    """
+    Main function which calls other functions to process transcripts and count keyword occurrences.
 
-            # Create the directory hierarchy if it does not exist
-            os.makedirs(directory, exist_ok=True)
+    vocabulary: scores each distinct word of all the transcripts once instead of once per transcript
+    cache_dir: directory caching the scores of the words for later runs, implies vocabulary
+    exact: finds the exact occurrences of keywords and phrases first, fuzzy matching single words
+           being only used for the keywords without any
+           (off by default, it changes the counts of the fuzzy matching)
+    workers: number of processes matching the transcripts
+    chunk_size: number of transcripts sent at once to a worker
+    mode: 'fuzzy' to match the words of the text, 'lemma' to look up the lemmas of the transcripts
+    compare_path: runs both modes and saves how their keyword counts differ to this JSON file
+    store_path: directory of a spot store the spots are appended to, instead of the per-file JSON outputs
+    export_json: also writes the per-file JSON outputs with a spot store
+    """
+    export_json = export_json or not store_path
+    # The first mode is written, the second one is only counted for the comparison
+    modes = [mode]
+    if compare_path:
+        modes.append('fuzzy' if mode == 'lemma' else 'lemma')
 
-            # Write the JSON data to the file
-            with open(f"{directory}/{timestamp}_spot.json", "w", encoding="utf-8") as f:
-                json.dump(data, f)
+    print('[-] Importing data')
+    # Loading data needed
+    with open(keywords_path, 'r', encoding='UTF-8') as file:
+        keywords = json.load(file)
 
-            bar.next()
-            end_time = time.perf_counter()
+    with open(transcript_path, 'r', encoding='UTF-8') as file:
+        transcripts = json.load(file)
+
+    tabs = [None] * len(transcripts)
+    offsets = [None] * len(transcripts)
+    matcher = None
+    if (vocabulary or cache_dir) and 'fuzzy' in modes:
+        print('[-] Scoring vocabulary')
+        index = KeywordIndex(keywords, score_cutoff=90)
+        matcher = Vocabulary(index, cache_dir)
+        # Tokenize the strings into word ids and start offsets
+        for i, transcript in enumerate(transcripts):
+            tokens = tokenize(transcript["text"])
+            tabs[i] = matcher.tokens(word for word, _, _ in tokens)
+            offsets[i] = array('I', (start for _, start, _ in tokens))
+        if workers > 1:
+            with Pool(workers, initializer=init_scorer, initargs=(index,)) as pool:
+                cached, scored = matcher.score(pool)
+        else:
+            cached, scored = matcher.score()
+        print(f'[-] {len(matcher.words)} distinct words, {cached} read from cache, {scored} scored')
 
-            print("Durée d'exécution :", end_time - start_time, "secondes")
+    print('[-] Generating statistics')
+    items = zip(transcripts, tabs, offsets)
+    pool = None
+    if workers > 1:
+        pool = Pool(workers, initializer=init_worker,
+                    initargs=(keywords, exact, matcher, modes, export_json, bool(store_path)))
+        results = pool.imap(match_transcript, items, chunksize=chunk_size)
+    else:
+        init_worker(keywords, exact, matcher, modes, export_json, bool(store_path))
+        results = map(match_transcript, items)
+
+    store = SpotStoreWriter(store_path, keywords) if store_path else None
+    totals = [{} for _ in modes]
+    with Bar('Processing', max=len(transcripts)) as bar:
+        # Results come back in the order of the transcripts
+        for transcript, (duration, counts, spots) in zip(transcripts, results):
+            for total, mode_counts in zip(totals, counts or []):
+                for keyword, count in mode_counts.items():
+                    total[keyword] = total.get(keyword, 0) + count
+            if store:
+                store.add(transcript["file"], spots)
+            bar.next()
+            print("Durée d'exécution :", duration, "secondes")
         bar.finish()
 
-# Parse command line arguments
-parser = argparse.ArgumentParser(description='Counts keywords occurences for each transcript')
-parser.add_argument('--transcript', help='Path of the transcripts file', required=True)
-parser.add_argument('--keywords', help='Path of the keywords file', required=True)
-args = parser.parse_args()
+    if pool:
+        pool.close()
+        pool.join()
+
+    if store:
+        print('[-] Saving spot store')
+        files, rows = store.close()
+        print(f'[-] {files} files, {rows} spots in {store_path}')
+
+    if compare_path:
+        counts = dict(zip(modes, totals))
+        differences = compare_counts(counts['lemma'], counts['fuzzy'])
+        print(f"[-] {sum(counts['lemma'].values())} occurrences in lemma mode, "
+              f"{sum(counts['fuzzy'].values())} in fuzzy mode, {len(differences)} keywords counted differently")
+        with open(compare_path, 'w', encoding='UTF-8') as file:
+            json.dump(differences, file, ensure_ascii=False)
+
 
 if __name__ == "__main__":
-    main(args.transcript, args.keywords)
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Counts keywords occurences for each transcript')
+    parser.add_argument('--transcript', help='Path of the transcripts file', required=True)
+    parser.add_argument('--keywords', help='Path of the keywords file', required=True)
+    parser.add_argument('--vocabulary', help='Score each distinct word of all the transcripts once',
+                        action='store_true')
+    parser.add_argument('--cache', help='Directory of the word scores cache, implies --vocabulary', default=None)
+    parser.add_argument('--exact', help='Find the exact occurrences of keywords and phrases before fuzzy matching, '
+                                        'changes the counts', action='store_true')
+    parser.add_argument('--workers', help='Number of matching processes', type=int, default=1)
+    parser.add_argument('--chunk-size', help='Number of transcripts sent at once to a worker', type=int,
+                        default=16)
+    parser.add_argument('--mode', help='Match the words of the text or look up the lemmas of the transcripts',
+                        choices=['fuzzy', 'lemma'], default='fuzzy')
+    parser.add_argument('--compare', help='Path of a json file saving how the counts of both modes differ',
+                        default=None)
+    parser.add_argument('--store', help='Directory of a columnar spot store replacing the per-file json files',
+                        default=None)
+    parser.add_argument('--json', help='Also write the per-file json files with --store', action='store_true')
+    args = parser.parse_args()
+
+    main(args.transcript, args.keywords, args.vocabulary, args.cache, args.exact, args.workers,
+         args.chunk_size, args.mode, args.compare, args.store, args.json)
@@ -0,0 +1 @@
+from .main import generate_corpus, run_backend, BACKENDS
\ No newline at end of file
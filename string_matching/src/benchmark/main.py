@@ -0,0 +1,228 @@
+import random
+import shutil
+import tempfile
+import time
+
+from fuzzywuzzy import fuzz
+
+from src.inverted_index import IndexBuilder, InvertedIndex
+from src.lemma_matcher import LemmaMatcher
+from src.matcher import KeywordIndex, tokenize
+from src.phrases import PhraseMatcher
+from src.vocabulary import Vocabulary
+
+# Words of the synthetic transcripts, the first ones being the most frequent
+WORDS = [
+    'le', 'la', 'les', 'de', 'des', 'et', 'un', 'une', 'à', 'en', 'pour', 'sur', 'dans', 'avec', 'pas', 'plus',
+    'président', 'élection', 'candidat', 'candidate', 'campagne', 'retraite', 'retraites', 'réforme', 'pouvoir',
+    'achat', 'gouvernement', 'ministre', 'assemblée', 'nationale', 'vote', 'sondage', 'débat', 'programme',
+    'économie', 'économique', 'santé', 'hôpital', 'école', 'éducation', 'sécurité', 'police', 'justice',
+    'europe', 'européenne', 'guerre', 'ukraine', 'russie', 'prix', 'énergie', 'nucléaire', 'climat',
+    'écologie', 'travail', 'salaire', 'chômage', 'impôts', 'dette', 'budget', 'inflation', 'immigration',
+    'jeunes', 'français', 'française', 'france', 'paris', 'région', 'territoire', 'agriculture', 'entreprise',
+    'industrie', 'banlieue', 'logement', 'transport', 'carburant', 'essence', 'électricité', 'pénurie',
+    'manifestation', 'grève', 'syndicat', 'député', 'sénat', 'maire', 'premier', 'tour', 'second', 'résultat',
+    'abstention', 'électeur', 'électrice', 'meeting', 'déclaration', 'interview', 'journal', 'télévision',
+]
+# Multi-word keywords, their words being added to the transcripts together
+PHRASES = ["pouvoir d'achat", 'réforme des retraites', 'premier tour', 'assemblée nationale', 'prix du carburant']
+# Words left out of the lemmas like the stop words of spacy
+STOP_WORDS = {'le', 'la', 'les', 'de', 'des', 'et', 'un', 'une', 'à', 'en', 'pour', 'sur', 'dans', 'avec', 'pas',
+              'plus', 'du', "d'"}
+ACCENTS = {'é': 'e', 'è': 'e', 'ê': 'e', 'à': 'a', 'â': 'a', 'ô': 'o', 'ç': 'c', 'î': 'i', 'û': 'u'}
+
+
+def near_miss(word, generator):
+    """Returns a spelling error of a word like the ones of a transcription: missing accent, letter or double letter"""
+    kind = generator.randrange(4)
+    if kind == 0 and any(character in ACCENTS for character in word):
+        return ''.join(ACCENTS.get(character, character) for character in word)
+    if len(word) < 4:
+        return word
+    position = generator.randrange(1, len(word) - 1)
+    if kind == 1:
+        return word[:position] + word[position + 1:]
+    if kind == 2:
+        return word[:position] + word[position] + word[position:]
+    return word[:position] + generator.choice('aeioulnrst') + word[position + 1:]
+
+
+def generate_corpus(transcripts=20, words=2000, keywords=200, near_miss_rate=0.1, seed=0):
+    """
+    Generates deterministic synthetic French transcripts with the fields of the transcripts tool, the lemmas
+    being the correct spelling of the words without stop words, and a keyword list made of words, phrases
+    and a few near-miss spellings.
+
+    Returns the list of transcripts and the list of keywords
+    """
+    generator = random.Random(seed)
+    # Zipf-like weights so a few words are very frequent
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+    corpus = []
+    for index in range(transcripts):
+        spoken = []
+        lemmas = []
+        while len(spoken) < words:
+            if generator.random() < 0.02:
+                phrase = generator.choice(PHRASES)
+                spoken.append(phrase)
+                lemmas.extend(word for word in phrase.replace("'", "' ").split() if word not in STOP_WORDS)
+                continue
+            word = generator.choices(WORDS, weights)[0]
+            if word not in STOP_WORDS:
+                lemmas.append(word)
+            spoken.append(near_miss(word, generator) if generator.random() < near_miss_rate else word)
+        timestamp = 1646136000 + index * 3600
+        corpus.append({
+            "file": f"F:/database/202203{1 + index // 24:02d}/{timestamp}/{timestamp}_audio.mp4",
+            "text": ' '.join(spoken),
+            "lemmas": lemmas
+        })
+
+    keyword_list = list(PHRASES)
+    candidates = [word for word in WORDS if word not in STOP_WORDS]
+    while len(keyword_list) < keywords:
+        word = generator.choice(candidates)
+        if generator.random() < 0.1:
+            word = near_miss(word, generator)
+        if word not in keyword_list:
+            keyword_list.append(word)
+        elif len(keyword_list) >= len(set(candidates)) + len(PHRASES):
+            # Every word is already a keyword, adding numbered ones
+            keyword_list.append(f'{word}{len(keyword_list)}')
+    return corpus, keyword_list[:keywords]
+
+
+def count_hits(counts, keywords, matches):
+    """Adds the number of occurrences of every keyword of the list to a dict of keyword -> count"""
+    for keyword in keywords:
+        counts[keyword] = counts.get(keyword, 0) + len(matches.get(keyword, []))
+
+
+def run_baseline(transcripts, keywords):
+    """Scores every keyword against every word, like files_classic did"""
+    durations, counts = [], []
+    for transcript in transcripts:
+        start = time.perf_counter()
+        words = [word for word, _, _ in tokenize(transcript["text"])]
+        file_counts = {}
+        for keyword in keywords:
+            file_counts[keyword] = file_counts.get(keyword, 0) + sum(
+                1 for word in words if fuzz.token_set_ratio(keyword, word) >= 90)
+        durations.append(time.perf_counter() - start)
+        counts.append(file_counts)
+    return 0, durations, counts
+
+
+def run_index(transcripts, keywords):
+    """Bigram candidate index, every distinct word of a transcript being scored once"""
+    start = time.perf_counter()
+    index = KeywordIndex(keywords, score_cutoff=90)
+    setup = time.perf_counter() - start
+    durations, counts = [], []
+    for transcript in transcripts:
+        start = time.perf_counter()
+        file_counts = {}
+        count_hits(file_counts, keywords, index.match([word for word, _, _ in tokenize(transcript["text"])]))
+        durations.append(time.perf_counter() - start)
+        counts.append(file_counts)
+    return setup, durations, counts
+
+
+def run_vocabulary(transcripts, keywords):
+    """Distinct words of the whole corpus scored once, the scoring being part of the setup"""
+    start = time.perf_counter()
+    vocabulary = Vocabulary(KeywordIndex(keywords, score_cutoff=90))
+    tabs = [vocabulary.tokens(word for word, _, _ in tokenize(transcript["text"])) for transcript in transcripts]
+    vocabulary.score()
+    setup = time.perf_counter() - start
+    durations, counts = [], []
+    for tab in tabs:
+        start = time.perf_counter()
+        file_counts = {}
+        count_hits(file_counts, keywords, vocabulary.match(tab))
+        durations.append(time.perf_counter() - start)
+        counts.append(file_counts)
+    return setup, durations, counts
+
+
+def run_exact(transcripts, keywords):
+    """Aho-Corasick exact pass with the bigram index as fallback, the --exact option of files_classic"""
+    start = time.perf_counter()
+    index = KeywordIndex(keywords, score_cutoff=90)
+    phrases = PhraseMatcher(keywords)
+    setup = time.perf_counter() - start
+    durations, counts = [], []
+    for transcript in transcripts:
+        start = time.perf_counter()
+        exact = phrases.find(transcript["text"])
+        matches = index.match([word for word, _, _ in tokenize(transcript["text"])])
+        file_counts = {}
+        count_hits(file_counts, keywords, {**matches, **exact})
+        durations.append(time.perf_counter() - start)
+        counts.append(file_counts)
+    return setup, durations, counts
+
+
+def run_lemma(transcripts, keywords):
+    """Dictionary lookup of the keywords among the lemmas"""
+    start = time.perf_counter()
+    matcher = LemmaMatcher(keywords)
+    setup = time.perf_counter() - start
+    durations, counts = [], []
+    for transcript in transcripts:
+        start = time.perf_counter()
+        file_counts = {}
+        count_hits(file_counts, keywords, matcher.match(transcript["lemmas"]))
+        durations.append(time.perf_counter() - start)
+        counts.append(file_counts)
+    return setup, durations, counts
+
+
+def run_inverted_index(transcripts, keywords):
+    """
+    Inverted index built once, every keyword being looked up with a fuzzy query.
+    Building and querying are part of the setup, reading the hits of a file is the per-file time
+    """
+    start = time.perf_counter()
+    directory = tempfile.mkdtemp(prefix='string_matching_index_')
+    try:
+        builder = IndexBuilder(directory)
+        for transcript in transcripts:
+            builder.add(transcript["file"], transcript["text"])
+        builder.save()
+        index = InvertedIndex(directory)
+        hits = [{} for _ in transcripts]
+        for keyword, terms in index.fuzzy(keywords).items():
+            for term, _ in terms:
+                for file_id, _, _ in index.exact(term):
+                    hits[file_id].setdefault(keyword, []).append(term)
+        index.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    setup = time.perf_counter() - start
+    durations, counts = [], []
+    for file_hits in hits:
+        start = time.perf_counter()
+        file_counts = {}
+        count_hits(file_counts, keywords, file_hits)
+        durations.append(time.perf_counter() - start)
+        counts.append(file_counts)
+    return setup, durations, counts
+
+
+# Matching backends, each returning its setup time, the time spent on every file and the keyword counts
+# of every file
+BACKENDS = {
+    'baseline': run_baseline,
+    'index': run_index,
+    'vocabulary': run_vocabulary,
+    'exact': run_exact,
+    'lemma': run_lemma,
+    'inverted_index': run_inverted_index,
+}
+
+
+def run_backend(name, transcripts, keywords):
+    """Runs a matching backend"""
+    return BACKENDS[name](transcripts, keywords)
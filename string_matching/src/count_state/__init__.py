@@ -0,0 +1 @@
+from .main import CountState
\ No newline at end of file
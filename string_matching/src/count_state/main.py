@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+
+
+class CountState:
+    """
+    Keyword counts of every transcript already counted by uniqueFile, so later runs only count new ones.
+
+    The state is a JSON file with the key of the counting setting (keyword list, mode, exact pass) and the
+    dict of file -> {keyword: count}, zero counts left out. States of the same setting, computed on
+    different machines or shards, can be merged.
+    """
+
+    def __init__(self, path, keywords, setting):
+        """
+        path: path of the JSON state file, None for a state only kept in memory
+        keywords: keyword list, part of the key
+        setting: dict of the other options changing the counts, part of the key
+        """
+        self.path = path
+        self.key = hashlib.sha256(json.dumps([keywords, setting], ensure_ascii=False, sort_keys=True)
+                                  .encode('UTF-8')).hexdigest()
+        self.files = {}
+
+    def load(self):
+        """
+        Loads the state file.
+
+        Returns False when the file was written for another setting and is ignored
+        """
+        if self.path is None or not os.path.isfile(self.path):
+            return True
+        with open(self.path, 'r', encoding='UTF-8') as file:
+            content = json.load(file)
+        if content.get('key') != self.key:
+            return False
+        self.files = content['files']
+        return True
+
+    def save(self):
+        """Saves the state, written to a temporary file first so a crash cannot corrupt it"""
+        temporary_file = f'{self.path}.tmp'
+        with open(temporary_file, 'w', encoding='UTF-8') as file:
+            json.dump({"key": self.key, "files": self.files}, file, ensure_ascii=False)
+        os.replace(temporary_file, self.path)
+
+    def add(self, file, counts):
+        """Records the keyword counts of a transcript"""
+        self.files[file] = counts
+
+    def merge(self, path):
+        """
+        Adds the files of another state file of the same setting, the files already counted here being kept.
+
+        Returns the number of files added, and the list of the files counted differently in both states
+        """
+        with open(path, 'r', encoding='UTF-8') as file:
+            content = json.load(file)
+        if content.get('key') != self.key:
+            raise ValueError(f'{path} was computed with other keywords or options')
+        added = 0
+        conflicts = []
+        for file, counts in content['files'].items():
+            if file not in self.files:
+                self.files[file] = counts
+                added += 1
+            elif self.files[file] != counts:
+                conflicts.append(file)
+        return added, conflicts
+
+    def totals(self, occurences_dict):
+        """Adds the counts of every file of the state to a dict of keyword -> count"""
+        # Summing files in sorted order so the reduction does not depend on how the state was built
+        for file in sorted(self.files):
+            for keyword, count in self.files[file].items():
+                occurences_dict[keyword] += count
+        return occurences_dict
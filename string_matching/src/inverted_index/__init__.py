@@ -0,0 +1 @@
+from .main import IndexBuilder, InvertedIndex
\ No newline at end of file
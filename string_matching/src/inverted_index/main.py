@@ -0,0 +1,300 @@
+import json
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from fuzzywuzzy import fuzz
+
+from src.matcher.main import bigrams, length_bounds, min_ratio, process, shared_bigrams_needed, tokenize
+
+# Layout of an index directory, every binary file being an array in the byte order saved in index.json
+INDEX = 'index.json'
+TERMS = 'terms.bin'
+TERM_STARTS = 'term_starts.bin'
+OFFSETS = 'offsets.bin'
+POSTINGS = 'postings.bin'
+PROCESSED = 'processed.bin'
+PROCESSED_STARTS = 'processed_starts.bin'
+PROCESSED_LENGTHS = 'processed_lengths.bin'
+PROCESSED_OFFSETS = 'processed_offsets.bin'
+PROCESSED_POSTINGS = 'processed_postings.bin'
+GRAMS = 'grams.bin'
+GRAM_STARTS = 'gram_starts.bin'
+GRAM_OFFSETS = 'gram_offsets.bin'
+GRAM_POSTINGS = 'gram_postings.bin'
+VERSION = 2
+
+
+def write_array(path, values):
+    with open(path, 'wb') as file:
+        values.tofile(file)
+
+
+def write_strings(path, starts_path, strings):
+    """Writes strings encoded in UTF-8 one after the other with the uint64 byte offsets of their starts"""
+    starts = array('Q', [0])
+    with open(path, 'wb') as file:
+        for string in strings:
+            encoded = string.encode('UTF-8')
+            file.write(encoded)
+            starts.append(starts[-1] + len(encoded))
+    write_array(starts_path, starts)
+
+
+class StringTable:
+    """
+    Sequence of the strings written by write_strings, decoded from the memory-mapped files when accessed,
+    so a sorted table can be searched with bisect without being loaded
+    """
+
+    def __init__(self, data, starts):
+        self.data = data
+        self.starts = starts
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    def __getitem__(self, index):
+        return bytes(self.data[self.starts[index]:self.starts[index + 1]]).decode('UTF-8')
+
+
+class IndexBuilder:
+    """
+    Builds an inverted index of the words of the transcripts, saved as a directory of flat files:
+
+    - index.json: version, byte order and list of the transcript files, a file id being a position
+    - terms.bin, term_starts.bin: sorted distinct words in UTF-8 and the uint64 byte offsets of their starts,
+      a term id being a position
+    - offsets.bin: uint64 array giving for each term id the start of its postings, plus the end
+    - postings.bin: uint32 array of (file id, word index, character offset) triples by term and file
+    - processed.bin, processed_starts.bin: distinct terms as processed by fuzzywuzzy before scoring,
+      sorted by length then term, with processed_lengths.bin giving their uint32 lengths in characters
+      and processed_offsets.bin and processed_postings.bin giving their uint32 term ids
+    - grams.bin, gram_starts.bin, gram_offsets.bin, gram_postings.bin: sorted padded bigrams of the
+      processed terms with the uint32 ids of the processed terms containing each of them, for fuzzy lookups
+
+    Postings are kept in memory until save() is called.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.files = []
+        self.postings = {}
+
+    def add(self, file, text):
+        """Adds the words of a transcript to the index"""
+        file_id = len(self.files)
+        self.files.append(file)
+        for position, (word, start, _) in enumerate(tokenize(text)):
+            postings = self.postings.get(word)
+            if postings is None:
+                postings = self.postings[word] = array('I')
+            postings.extend((file_id, position, start))
+
+    def _save_postings(self, offsets_name, postings_name, postings_lists):
+        """Writes uint32 postings lists one after the other with the uint64 offsets of their starts"""
+        offsets = array('Q', [0])
+        with open(os.path.join(self.output_dir, postings_name), 'wb') as file:
+            for postings in postings_lists:
+                postings.tofile(file)
+                offsets.append(offsets[-1] + len(postings))
+        write_array(os.path.join(self.output_dir, offsets_name), offsets)
+
+    def save(self):
+        """Writes the index directory"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        terms = sorted(self.postings)
+
+        # Offsets count (file id, word index, character offset) triples
+        offsets = array('Q', [0])
+        with open(os.path.join(self.output_dir, POSTINGS), 'wb') as file:
+            for term in terms:
+                postings = self.postings[term]
+                postings.tofile(file)
+                offsets.append(offsets[-1] + len(postings) // 3)
+        write_array(os.path.join(self.output_dir, OFFSETS), offsets)
+        write_strings(os.path.join(self.output_dir, TERMS), os.path.join(self.output_dir, TERM_STARTS), terms)
+
+        # Distinct processed terms sorted by length, with their terms and bigrams for fuzzy lookups
+        processed_terms = {}
+        for term_id, term in enumerate(terms):
+            word = process(term)
+            if word:
+                processed_terms.setdefault(word, array('I')).append(term_id)
+        processed = sorted(processed_terms, key=lambda word: (len(word), word))
+        self._save_postings(PROCESSED_OFFSETS, PROCESSED_POSTINGS, [processed_terms[word] for word in processed])
+        write_strings(os.path.join(self.output_dir, PROCESSED), os.path.join(self.output_dir, PROCESSED_STARTS),
+                      processed)
+        write_array(os.path.join(self.output_dir, PROCESSED_LENGTHS), array('I', [len(word) for word in processed]))
+
+        gram_words = {}
+        for word_id, word in enumerate(processed):
+            for gram in set(bigrams(word)):
+                gram_words.setdefault(gram, array('I')).append(word_id)
+        grams = sorted(gram_words)
+        self._save_postings(GRAM_OFFSETS, GRAM_POSTINGS, [gram_words[gram] for gram in grams])
+        write_strings(os.path.join(self.output_dir, GRAMS), os.path.join(self.output_dir, GRAM_STARTS), grams)
+
+        with open(os.path.join(self.output_dir, INDEX), 'w', encoding='UTF-8') as file:
+            json.dump({"version": VERSION, "byteorder": sys.byteorder, "files": self.files}, file,
+                      ensure_ascii=False)
+        return len(terms), sum(len(postings) for postings in self.postings.values()) // 3
+
+
+class InvertedIndex:
+    """
+    Read-only access to an index directory written by IndexBuilder, every file but index.json being memory-mapped.
+    Answers exact, prefix and fuzzy lookups of keywords without reading the transcripts.
+    """
+
+    def __init__(self, index_dir, score_cutoff=90):
+        self.index_dir = index_dir
+        self.score_cutoff = score_cutoff
+        self.min_ratio = min_ratio(score_cutoff)
+        with open(os.path.join(index_dir, INDEX), 'r', encoding='UTF-8') as file:
+            index = json.load(file)
+        if index.get("version") != VERSION or index.get("byteorder") != sys.byteorder:
+            raise ValueError(f'Unsupported index {index_dir}, it has to be rebuilt')
+        self.files = index["files"]
+        self.maps = []
+        self.terms = StringTable(self._map(TERMS, 'B'), self._map(TERM_STARTS, 'Q'))
+        self.offsets = self._map(OFFSETS, 'Q')
+        self.postings = self._map(POSTINGS, 'I')
+        # Loaded by the first fuzzy lookup
+        self.processed = None
+        self.grams = None
+
+    def _map(self, name, typecode):
+        """Memory-maps a binary file of the index as an array of a typecode"""
+        with open(os.path.join(self.index_dir, name), 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return array(typecode)
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped).cast(typecode)
+        self.maps.append((mapped, view))
+        return view
+
+    def _load_grams(self):
+        """Maps the processed terms and the bigram index used by fuzzy lookups"""
+        self.processed = StringTable(self._map(PROCESSED, 'B'), self._map(PROCESSED_STARTS, 'Q'))
+        self.lengths = self._map(PROCESSED_LENGTHS, 'I')
+        self.processed_offsets = self._map(PROCESSED_OFFSETS, 'Q')
+        self.processed_postings = self._map(PROCESSED_POSTINGS, 'I')
+        self.grams = StringTable(self._map(GRAMS, 'B'), self._map(GRAM_STARTS, 'Q'))
+        self.gram_offsets = self._map(GRAM_OFFSETS, 'Q')
+        self.gram_postings = self._map(GRAM_POSTINGS, 'I')
+
+    def close(self):
+        """Releases the memory-mapped files"""
+        for mapped, view in self.maps:
+            view.release()
+            mapped.close()
+        self.maps = []
+
+    def term_id(self, term):
+        """Returns the id of a term, None if it is not in the index"""
+        term_id = bisect_left(self.terms, term)
+        if term_id < len(self.terms) and self.terms[term_id] == term:
+            return term_id
+        return None
+
+    def term_postings(self, term_id):
+        """Returns the list of (file id, word index, character offset) of a term id"""
+        start, end = self.offsets[term_id] * 3, self.offsets[term_id + 1] * 3
+        postings = self.postings[start:end]
+        return [tuple(postings[i:i + 3]) for i in range(0, len(postings), 3)]
+
+    def exact(self, term):
+        """Returns the list of (file id, word index, character offset) of the occurrences of a word"""
+        term_id = self.term_id(term)
+        return [] if term_id is None else self.term_postings(term_id)
+
+    def prefix(self, prefix):
+        """Returns a dict of term -> list of (file id, word index, character offset) of the terms of a prefix"""
+        results = {}
+        term_id = bisect_left(self.terms, prefix)
+        while term_id < len(self.terms) and self.terms[term_id].startswith(prefix):
+            results[self.terms[term_id]] = self.term_postings(term_id)
+            term_id += 1
+        return results
+
+    def processed_id(self, word):
+        """Returns the id of a processed term, None if it is not in the index"""
+        # Processed terms are sorted by length then term, the bisection is done among the terms of its length
+        first, last = bisect_left(self.lengths, len(word)), bisect_left(self.lengths, len(word) + 1)
+        word_id = bisect_left(self.processed, word, first, last)
+        if word_id < last and self.processed[word_id] == word:
+            return word_id
+        return None
+
+    def gram_id(self, gram):
+        """Returns the id of a bigram, None if no processed term contains it"""
+        gram_id = bisect_left(self.grams, gram)
+        if gram_id < len(self.grams) and self.grams[gram_id] == gram:
+            return gram_id
+        return None
+
+    def fuzzy_candidates(self, keyword):
+        """
+        Returns the set of the ids of the processed terms able to reach the score cutoff against a keyword
+        with fuzz.token_set_ratio, with the bounds of KeywordIndex seen from the keyword side.
+        Bigrams shared with the keyword are counted on the processed terms of a compatible length only,
+        found by bisection as they are sorted by length
+        """
+        if self.grams is None:
+            self._load_grams()
+        processed = process(keyword)
+        if not processed:
+            return set()
+
+        tokens = set(processed.split())
+        # Terms which are one of the keyword tokens score 100
+        candidates = {self.processed_id(token) for token in tokens} - {None}
+
+        joined = ' '.join(sorted(tokens))
+        n = len(joined)
+        low, high = length_bounds(n, self.min_ratio)
+        first, last = bisect_left(self.lengths, low), bisect_left(self.lengths, high + 1)
+        needed = {m: shared_bigrams_needed(n, m, self.min_ratio) for m in range(low, high + 1)}
+        least = min(needed.values())
+        if least <= 0:
+            # Cannot happen with a useful cutoff, every term of a compatible length is a candidate
+            return candidates.union(range(first, last))
+
+        # Counting each bigram with its number of occurrences in the keyword, which is at least the
+        # number of occurrences shared with a term, so no candidate is lost
+        shared = Counter()
+        for gram, count in Counter(bigrams(joined)).items():
+            gram_id = self.gram_id(gram)
+            if gram_id is None:
+                continue
+            postings = self.gram_postings[self.gram_offsets[gram_id]:self.gram_offsets[gram_id + 1]]
+            window = postings[bisect_left(postings, first):bisect_left(postings, last)]
+            for _ in range(count):
+                shared.update(window)
+        lengths = self.lengths
+        for word_id, count in shared.items():
+            if count >= least and count >= needed[lengths[word_id]]:
+                candidates.add(word_id)
+        return candidates
+
+    def fuzzy(self, keywords):
+        """
+        Finds the terms matching each keyword with fuzz.token_set_ratio at the score cutoff.
+
+        Returns a dict of keyword -> list of (term, score) sorted by term
+        """
+        results = {}
+        for keyword in dict.fromkeys(keywords):
+            matches = []
+            for word_id in self.fuzzy_candidates(keyword):
+                term_ids = self.processed_postings[self.processed_offsets[word_id]:self.processed_offsets[word_id + 1]]
+                # The score only depends on the processed term, it is the same for all its terms
+                score = fuzz.token_set_ratio(keyword, self.terms[term_ids[0]])
+                if score >= self.score_cutoff:
+                    matches.extend((self.terms[term_id], score) for term_id in term_ids)
+            results[keyword] = sorted(matches)
+        return results
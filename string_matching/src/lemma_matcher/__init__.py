@@ -0,0 +1 @@
+from .main import LemmaMatcher, compare_counts
\ No newline at end of file
@@ -0,0 +1,52 @@
+class LemmaMatcher:
+    """
+    Exact matching of the keywords against the lemmas saved with each transcript.
+    The keywords of KeywordSorter are lemmas too, so a dictionary lookup per lemma is enough.
+    A keyword of several words matches the same words in consecutive lemmas, its words have to be lemmas
+    and not stop words as those are left out of the lemmas of the transcripts.
+    """
+
+    def __init__(self, keywords):
+        """
+        Builds the dictionary of keyword -> keyword id, the id being its first position in the list,
+        and the dictionary of first word -> (words, keyword) of the keywords of several words
+        """
+        self.keyword_ids = {}
+        self.phrases = {}
+        for idx, keyword in enumerate(keywords):
+            if keyword not in self.keyword_ids:
+                self.keyword_ids[keyword] = idx
+                words = tuple(keyword.split())
+                if len(words) > 1:
+                    self.phrases.setdefault(words[0], []).append((words, keyword))
+
+    def match(self, lemmas):
+        """
+        Returns a dict of keyword -> list of the indices of its occurrences in the lemmas,
+        the index of the first lemma for a keyword of several words
+        """
+        results = {}
+        for index, lemma in enumerate(lemmas):
+            if lemma in self.keyword_ids:
+                results.setdefault(lemma, []).append(index)
+            for words, keyword in self.phrases.get(lemma, ()):
+                if tuple(lemmas[index:index + len(words)]) == words:
+                    results.setdefault(keyword, []).append(index)
+        return results
+
+
+def compare_counts(lemma_counts, fuzzy_counts):
+    """
+    Compares the keyword counts of the lemma and fuzzy modes.
+
+    Returns the list of {"keyword", "lemma", "fuzzy", "difference"} of the keywords counted differently,
+    the largest differences first
+    """
+    differences = []
+    for keyword in dict.fromkeys(list(lemma_counts) + list(fuzzy_counts)):
+        lemma = lemma_counts.get(keyword, 0)
+        fuzzy = fuzzy_counts.get(keyword, 0)
+        if lemma != fuzzy:
+            differences.append({"keyword": keyword, "lemma": lemma, "fuzzy": fuzzy, "difference": lemma - fuzzy})
+    differences.sort(key=lambda difference: -abs(difference["difference"]))
+    return differences
@@ -0,0 +1 @@
+from .main import KeywordIndex, tokenize
\ No newline at end of file
@@ -0,0 +1,159 @@
+import re
+from collections import Counter, defaultdict
+from math import ceil, floor
+
+from fuzzywuzzy import fuzz, utils
+
+WORD = re.compile(r'\b\w+\b')
+
+
+def tokenize(text):
+    """Splits a text into words, returning a list of (word, start offset, end offset)"""
+    return [(match.group(), match.start(), match.end()) for match in WORD.finditer(text)]
+
+
+def process(string):
+    """Processes a string like fuzz.token_set_ratio does before scoring"""
+    return utils.full_process(string, force_ascii=True)
+
+
+def bigrams(string):
+    """Returns the bigrams of a string padded with a start and an end character"""
+    padded = f'\x02{string}\x03'
+    return [padded[i:i + 2] for i in range(len(padded) - 1)]
+
+
+def min_ratio(score_cutoff):
+    """Returns the lowest ratio rounded to the cutoff by fuzzywuzzy, lowered a bit to stay safe from float errors"""
+    return (score_cutoff - 0.5) / 100 - 1e-9
+
+
+def length_bounds(n, ratio):
+    """Returns the lowest and highest lengths of a string able to reach a ratio against a string of length n"""
+    return ceil(n * ratio / (2 - ratio)), floor(n * (2 - ratio) / ratio)
+
+
+def shared_bigrams_needed(n, m, ratio):
+    """Returns the minimum number of bigrams shared by strings of lengths n and m reaching a ratio"""
+    return max(n, m) + 1 - 2 * floor((1 - ratio) * (n + m))
+
+
+class KeywordIndex:
+    """
+    Character bigram index over a keyword list, returning for a word only the keywords able to reach
+    the score cutoff with fuzz.token_set_ratio. Exact scoring then runs on those candidates only,
+    so the results are the same as scoring every keyword.
+
+    A word is a single token, so against a keyword its token_set_ratio is 100 if the word is one of the
+    keyword tokens, and otherwise the ratio between the word and the sorted keyword tokens.
+    That ratio is at most 2 * min(n, m) / (n + m) for lengths n and m, and if it reaches the cutoff the
+    indel distance d of the two strings is at most (1 - cutoff) * (n + m), so they share at least
+    max(n, m) + 1 - 2 * d padded bigrams. Only the rarest bigrams of the word need to be looked up
+    to find every keyword sharing that many.
+    """
+
+    def __init__(self, keywords, score_cutoff=90, empty_match=False):
+        """
+        Builds the index.
+
+        keywords: list of keywords, duplicates are indexed once
+        score_cutoff: minimum token_set_ratio score of a match
+        empty_match: scores like process.extractBests, where a keyword and a word both emptied by the
+                     processing match with 100 instead of 0
+        """
+        self.keywords = list(dict.fromkeys(keywords))
+        self.score_cutoff = score_cutoff
+        self.empty_match = empty_match
+        self.min_ratio = min_ratio(score_cutoff)
+        # Keywords emptied by the processing, they can only match with empty_match
+        self.empty_keywords = []
+        # Keywords containing a token
+        self.token_keywords = defaultdict(set)
+        # Sorted tokens of the keywords, with their keywords, length and bigrams
+        self.joined_keywords = []
+        self.lengths = []
+        self.grams = []
+        self.postings = defaultdict(list)
+
+        joined_ids = {}
+        for keyword in self.keywords:
+            processed = process(keyword)
+            if not processed:
+                self.empty_keywords.append(keyword)
+                continue
+            tokens = set(processed.split())
+            for token in tokens:
+                self.token_keywords[token].add(keyword)
+            joined = ' '.join(sorted(tokens))
+            if joined not in joined_ids:
+                joined_id = len(self.joined_keywords)
+                joined_ids[joined] = joined_id
+                self.joined_keywords.append([])
+                self.lengths.append(len(joined))
+                self.grams.append(Counter(bigrams(joined)))
+                for gram in self.grams[joined_id]:
+                    self.postings[gram].append(joined_id)
+            self.joined_keywords[joined_ids[joined]].append(keyword)
+
+    def candidates(self, word):
+        """Returns the set of keywords which can reach the score cutoff against a word"""
+        processed = process(word)
+        if not processed:
+            return set(self.empty_keywords) if self.empty_match else set()
+
+        found = set(self.token_keywords.get(processed, ()))
+        m = len(processed)
+        low, high = length_bounds(m, self.min_ratio)
+        needed = min(shared_bigrams_needed(n, m, self.min_ratio) for n in range(low, high + 1))
+
+        word_grams = bigrams(processed)
+        if needed <= 0:
+            # Cannot happen with a useful cutoff, every keyword is a candidate
+            joined_ids = range(len(self.joined_keywords))
+        else:
+            # One of the rarest len - needed + 1 bigrams of the word is shared with every candidate
+            word_grams.sort(key=lambda gram: len(self.postings.get(gram, ())))
+            joined_ids = set()
+            for gram in set(word_grams[:len(word_grams) - needed + 1]):
+                joined_ids.update(self.postings.get(gram, ()))
+
+        word_counts = Counter(word_grams)
+        for joined_id in joined_ids:
+            n = self.lengths[joined_id]
+            if n < low or n > high:
+                continue
+            grams = self.grams[joined_id]
+            shared = sum(min(count, grams[gram]) for gram, count in word_counts.items() if gram in grams)
+            if shared >= shared_bigrams_needed(n, m, self.min_ratio):
+                found.update(self.joined_keywords[joined_id])
+        return found
+
+    def score(self, keyword, word):
+        """Scores a keyword against a word, like the original matching"""
+        if self.empty_match:
+            return fuzz.token_set_ratio(process(keyword), process(word), full_process=False)
+        return fuzz.token_set_ratio(keyword, word)
+
+    def scores(self, word):
+        """Returns the list of (keyword, score) of the keywords reaching the cutoff against a word"""
+        results = []
+        for keyword in self.candidates(word):
+            score = self.score(keyword, word)
+            if score >= self.score_cutoff:
+                results.append((keyword, score))
+        return results
+
+    def match(self, words):
+        """
+        Matches every word of a transcript, each distinct word being scored once.
+
+        Returns a dict of keyword -> list of (word index, word, score) in the order of the words
+        """
+        results = defaultdict(list)
+        scored = {}
+        for index, word in enumerate(words):
+            if word not in scored:
+                scored[word] = self.scores(word)
+            for keyword, score in scored[word]:
+                results[keyword].append((index, word, score))
+        return results
@@ -0,0 +1 @@
+from .main import PhraseMatcher, normalize
\ No newline at end of file
@@ -0,0 +1,123 @@
+import unicodedata
+from collections import deque
+
+# Characters folded to several letters or to a common form besides accents
+FOLDED = {
+    'œ': 'oe',
+    'æ': 'ae',
+    'ß': 'ss',
+    '’': "'",
+    'ʼ': "'",
+    '‘': "'",
+}
+
+
+def normalize(text):
+    """
+    Lowercases a text, removes its accents and collapses its whitespace runs into single spaces.
+
+    Returns the normalized text and the list giving for each of its characters the index of the original
+    character it comes from
+    """
+    characters = []
+    offsets = []
+    space = False
+    for index, character in enumerate(text):
+        if character.isspace():
+            # Keeping the first character of a whitespace run as a single space
+            if not space:
+                characters.append(' ')
+                offsets.append(index)
+            space = True
+            continue
+        space = False
+        folded = FOLDED.get(character.lower())
+        if folded is None:
+            decomposed = unicodedata.normalize('NFD', character)
+            folded = ''.join(part for part in decomposed if not unicodedata.combining(part)).lower()
+        for part in folded:
+            characters.append(part)
+            offsets.append(index)
+    return ''.join(characters), offsets
+
+
+def is_word_character(character):
+    return character.isalnum() or character == '_'
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton finding every exact occurrence of the keywords, single words or phrases,
+    in one scan of a normalized transcript.
+
+    An occurrence has to start and end on word boundaries, so "la" is not found inside "plat".
+    """
+
+    def __init__(self, keywords):
+        """Builds the automaton of the distinct normalized keywords"""
+        self.keywords = list(dict.fromkeys(keywords))
+        # Transitions, failure links and matched (pattern length, keywords) of every state
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        patterns = {}
+        for keyword in self.keywords:
+            pattern = normalize(keyword)[0].strip()
+            if pattern:
+                patterns.setdefault(pattern, []).append(keyword)
+
+        for pattern, pattern_keywords in patterns.items():
+            state = 0
+            for character in pattern:
+                next_state = self.goto[state].get(character)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][character] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append((len(pattern), pattern_keywords))
+
+        # Breadth first computation of the failure links, each state inheriting the output of its link
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for character, next_state in self.goto[state].items():
+                queue.append(next_state)
+                link = self.fail[state]
+                while link and character not in self.goto[link]:
+                    link = self.fail[link]
+                link = self.goto[link].get(character, 0)
+                self.fail[next_state] = link
+                self.output[next_state] = self.output[next_state] + self.output[link]
+
+    def find(self, text):
+        """
+        Finds the keyword occurrences of a text.
+
+        Returns a dict of keyword -> list of (start, end) offsets in the original text, by start offset
+        """
+        normalized, offsets = normalize(text)
+        results = {}
+        state = 0
+        for index, character in enumerate(normalized):
+            while state and character not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(character, 0)
+            for length, pattern_keywords in self.output[state]:
+                start = index - length + 1
+                # Checking the word boundaries around the occurrence
+                if start > 0 and is_word_character(normalized[start]) \
+                        and is_word_character(normalized[start - 1]):
+                    continue
+                if index + 1 < len(normalized) and is_word_character(character) \
+                        and is_word_character(normalized[index + 1]):
+                    continue
+                for keyword in pattern_keywords:
+                    results.setdefault(keyword, []).append((offsets[start], offsets[index] + 1))
+
+        for occurrences in results.values():
+            occurrences.sort()
+        return results
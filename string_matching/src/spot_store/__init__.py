@@ -0,0 +1 @@
+from .main import SpotStore, SpotStoreWriter
\ No newline at end of file
@@ -0,0 +1,171 @@
+import json
+import os
+import sys
+from array import array
+
+import numpy as np
+
+# Columns of a spot row with their array typecode and NumPy type
+COLUMNS = {
+    "file_id": ('I', np.uint32),
+    "keyword_id": ('I', np.uint32),
+    "start": ('q', np.int64),
+    "end": ('q', np.int64),
+    "position": ('q', np.int64),
+    "score": ('B', np.uint8),
+}
+STORE = 'store.json'
+FILES = 'files.txt'
+FILE_OFFSETS = 'file_offsets'
+VERSION = 2
+
+
+def read_header(path):
+    """Returns the content of store.json, None if the store does not exist"""
+    if not os.path.isfile(os.path.join(path, STORE)):
+        return None
+    with open(os.path.join(path, STORE), 'r', encoding='UTF-8') as file:
+        header = json.load(file)
+    if header.get("version") != VERSION or header.get("byteorder") != sys.byteorder:
+        raise ValueError(f'Unsupported spot store {path}, it has to be rebuilt')
+    return header
+
+
+def column_path(path, name):
+    return os.path.join(path, f'{name}.bin')
+
+
+class SpotStore:
+    """
+    Read-only access to a spot store, the columns being memory-mapped NumPy arrays.
+
+    A store is a directory of append-only files:
+    - <column>.bin for each column of COLUMNS, the raw values of the rows in the byte order of the store
+    - file_offsets.bin, int64 first row of each file, a file id being a position
+    - files.txt, one transcript file per line
+    - store.json, the header with the keyword list (a keyword id being a position in it) and the number
+      of files and rows written completely, which are the only ones read
+    Offsets are -1 for spots found among the lemmas.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        header = read_header(path)
+        if header is None:
+            raise FileNotFoundError(f'No spot store in {path}')
+        self.keywords = header["keywords"]
+        self.rows = header["rows"]
+        with open(os.path.join(path, FILES), 'r', encoding='UTF-8', newline='\n') as file:
+            self.files = [line.rstrip('\n') for _, line in zip(range(header["files"]), file)]
+        self.columns = {name: self._map(name, dtype, self.rows) for name, (_, dtype) in COLUMNS.items()}
+        self.file_offsets = self._map(FILE_OFFSETS, np.int64, len(self.files))
+        # A file counted again in a later run refers to its last spots
+        self.file_ids = {file: file_id for file_id, file in enumerate(self.files)}
+
+    def _map(self, name, dtype, length):
+        """Memory-maps the first rows of a column"""
+        if length == 0:
+            # An empty file cannot be mapped
+            return np.empty(0, dtype=dtype)
+        return np.memmap(column_path(self.path, name), dtype=dtype, mode='r', shape=(length,))
+
+    def __len__(self):
+        return self.rows
+
+    def spots(self, file):
+        """Returns the dict of column -> array of the spots of a file"""
+        file_id = self.file_ids[file]
+        start = self.file_offsets[file_id]
+        end = self.file_offsets[file_id + 1] if file_id + 1 < len(self.files) else self.rows
+        return {name: column[start:end] for name, column in self.columns.items()}
+
+
+class SpotStoreWriter:
+    """
+    Appends the spots of transcripts to a spot store, created if it does not exist.
+    Rows are buffered in compact arrays and appended to the column files every buffer_size rows,
+    the previous rows are never read nor rewritten. The header is written by close(), so rows appended
+    by an interrupted run are not part of the store and are overwritten by the next one.
+    """
+
+    def __init__(self, path, keywords, buffer_size=1 << 20):
+        """
+        path: directory of the store
+        keywords: keyword list, which has to be the one of an existing store
+        buffer_size: number of rows kept in memory before being appended to the files
+        """
+        self.path = path
+        self.keywords = keywords
+        self.buffer_size = buffer_size
+        os.makedirs(path, exist_ok=True)
+        header = read_header(path)
+        if header is not None and header["keywords"] != keywords:
+            raise ValueError(f'The spot store {path} was written for another keyword list')
+        self.file_count = header["files"] if header else 0
+        self.rows = header["rows"] if header else 0
+        self._truncate()
+        self.files = []
+        self.offsets = array('q')
+        self.columns = {name: array(typecode) for name, (typecode, _) in COLUMNS.items()}
+
+    def _truncate(self):
+        """Removes what an interrupted run appended after the rows and files of the header"""
+        sizes = {name: self.rows * np.dtype(dtype).itemsize for name, (_, dtype) in COLUMNS.items()}
+        sizes[FILE_OFFSETS] = self.file_count * np.dtype(np.int64).itemsize
+        for name, size in sizes.items():
+            file_path = column_path(self.path, name)
+            if not os.path.isfile(file_path):
+                open(file_path, 'wb').close()
+            elif os.path.getsize(file_path) > size:
+                os.truncate(file_path, size)
+        files_path = os.path.join(self.path, FILES)
+        with open(files_path, 'a+b') as file:
+            file.seek(0)
+            end = 0
+            for _ in range(self.file_count):
+                end += len(file.readline())
+            file.truncate(end)
+
+    def add(self, file, spots):
+        """
+        Adds the spots of a transcript, as generated by files_classic:
+        [keyword id, keyword, start offset, score, word, end offset, word index]
+        """
+        file_id = self.file_count + len(self.files)
+        self.files.append(file)
+        self.offsets.append(self.rows + len(self.columns["file_id"]))
+        columns = self.columns
+        for keyword_id, _, start, score, _, end, position in spots:
+            columns["file_id"].append(file_id)
+            columns["keyword_id"].append(keyword_id)
+            columns["start"].append(-1 if start is None else start)
+            columns["end"].append(-1 if end is None else end)
+            columns["position"].append(position)
+            columns["score"].append(score)
+        if len(columns["file_id"]) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Appends the buffered rows and files to the files of the store"""
+        for name, values in self.columns.items():
+            with open(column_path(self.path, name), 'ab') as file:
+                values.tofile(file)
+        with open(column_path(self.path, FILE_OFFSETS), 'ab') as file:
+            self.offsets.tofile(file)
+        with open(os.path.join(self.path, FILES), 'a', encoding='UTF-8', newline='\n') as file:
+            file.writelines(f'{name}\n' for name in self.files)
+        self.rows += len(self.columns["file_id"])
+        self.file_count += len(self.files)
+        self.files = []
+        self.offsets = array('q')
+        self.columns = {name: array(typecode) for name, (typecode, _) in COLUMNS.items()}
+
+    def close(self):
+        """Appends the remaining rows then writes the header, which makes the new rows part of the store"""
+        self.flush()
+        temporary_file = os.path.join(self.path, f'{STORE}.tmp')
+        with open(temporary_file, 'w', encoding='UTF-8') as file:
+            json.dump({"version": VERSION, "byteorder": sys.byteorder, "keywords": self.keywords,
+                       "files": self.file_count, "rows": self.rows}, file, ensure_ascii=False)
+        os.replace(temporary_file, os.path.join(self.path, STORE))
+        return self.file_count, self.rows
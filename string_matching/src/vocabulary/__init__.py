@@ -0,0 +1 @@
+from .main import Vocabulary, ScoreCache, init_scorer, score_words
\ No newline at end of file
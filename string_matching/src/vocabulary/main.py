@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+from array import array
+
+# KeywordIndex of a worker process scoring words, set by init_scorer
+scorer = None
+
+
+def init_scorer(index):
+    """Initializes a worker process of a pool given to Vocabulary.score"""
+    global scorer
+    scorer = index
+
+
+def score_words(words):
+    """Scores a chunk of words in a worker process"""
+    return [scorer.scores(word) for word in words]
+
+
+class ScoreCache:
+    """
+    On-disk cache of the keywords matched by every word, for one keyword list and scoring setting.
+
+    The cache directory holds one file per setting, named after the hash of the setting. It starts with
+    a JSON line with that key, followed by one [word, [[keyword id, score], ...]] line per word,
+    keyword ids being positions in the distinct keyword list of the index.
+    """
+
+    def __init__(self, directory, index):
+        setting = [index.keywords, index.score_cutoff, index.empty_match]
+        self.key = hashlib.sha256(json.dumps(setting, ensure_ascii=False).encode('UTF-8')).hexdigest()
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f'{self.key}.jsonl')
+        # Whether new entries can be appended to the file found by load()
+        self.appendable = False
+
+    def load(self):
+        """Returns the dict of word -> list of (keyword id, score) saved for this setting"""
+        entries = {}
+        self.appendable = False
+        if not os.path.isfile(self.path):
+            return entries
+        with open(self.path, 'r', encoding='UTF-8') as file:
+            try:
+                header = json.loads(file.readline())
+            except json.JSONDecodeError:
+                return entries
+            if header.get('key') != self.key:
+                return entries
+            self.appendable = True
+            for line in file:
+                # Skipping the partial last line left by an interrupted run, the file is then rewritten
+                if not line.endswith('\n'):
+                    self.appendable = False
+                    break
+                word, hits = json.loads(line)
+                entries[word] = [tuple(hit) for hit in hits]
+        return entries
+
+    def save(self, entries, append):
+        """
+        Saves entries of word -> list of (keyword id, score).
+
+        append: adds them to a file of this setting, otherwise the file is started over
+        """
+        mode = 'a' if append else 'w'
+        with open(self.path, mode, encoding='UTF-8') as file:
+            if not append:
+                file.write(json.dumps({'key': self.key}) + '\n')
+            for word, hits in entries.items():
+                file.write(json.dumps([word, hits], ensure_ascii=False) + '\n')
+
+
+class Vocabulary:
+    """
+    Distinct words of a whole corpus, each scored once against the keywords.
+
+    Transcripts are first turned into arrays of token ids with tokens(), then score() matches every
+    distinct word once, reading the scores of known words from the cache, and match() maps the token
+    ids of a transcript to its hits.
+    """
+
+    def __init__(self, index, cache_dir=None):
+        """
+        index: KeywordIndex used to score the words
+        cache_dir: directory of the ScoreCache files, None to always score
+        """
+        self.index = index
+        self.cache = ScoreCache(cache_dir, index) if cache_dir else None
+        self.words = []
+        self.ids = {}
+        # Keywords matched by each word id as (keyword, score), filled by score()
+        self.hits = []
+
+    def tokens(self, words):
+        """Adds the words of a transcript to the vocabulary and returns their ids"""
+        token_ids = array('I')
+        for word in words:
+            word_id = self.ids.get(word)
+            if word_id is None:
+                word_id = len(self.words)
+                self.ids[word] = word_id
+                self.words.append(word)
+            token_ids.append(word_id)
+        return token_ids
+
+    def score(self, pool=None, chunk_size=1000):
+        """
+        Scores the words added since the last call.
+
+        pool: multiprocessing pool initialized with init_scorer, scoring the words by chunks
+        chunk_size: number of words of a chunk
+
+        Returns the number of words read from the cache and the number of words scored
+        """
+        keywords = self.index.keywords
+        cached = self.cache.load() if self.cache else {}
+        keyword_ids = {keyword: keyword_id for keyword_id, keyword in enumerate(keywords)}
+        words = self.words[len(self.hits):]
+        unknown = [word for word in words if word not in cached]
+        if pool:
+            chunks = [unknown[i:i + chunk_size] for i in range(0, len(unknown), chunk_size)]
+            scores = [hits for chunk in pool.imap(score_words, chunks) for hits in chunk]
+        else:
+            scores = map(self.index.scores, unknown)
+        scored = dict(zip(unknown, scores))
+
+        new_entries = {}
+        for word in words:
+            if word in cached:
+                self.hits.append([(keywords[keyword_id], score) for keyword_id, score in cached[word]])
+            else:
+                hits = scored[word]
+                self.hits.append(hits)
+                new_entries[word] = [(keyword_ids[keyword], score) for keyword, score in hits]
+
+        if self.cache and new_entries:
+            if self.cache.appendable:
+                self.cache.save(new_entries, append=True)
+            else:
+                self.cache.save({**cached, **new_entries}, append=False)
+        return len(words) - len(unknown), len(new_entries)
+
+    def match(self, token_ids):
+        """
+        Maps the token ids of a transcript to its hits, score() being called beforehand.
+
+        Returns a dict of keyword -> list of (word index, word, score) like KeywordIndex.match
+        """
+        results = {}
+        for index, word_id in enumerate(token_ids):
+            hits = self.hits[word_id]
+            if not hits:
+                continue
+            word = self.words[word_id]
+            for keyword, score in hits:
+                results.setdefault(keyword, []).append((index, word, score))
+        return results
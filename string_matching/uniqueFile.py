@@ -8,8 +8,16 @@ import argparse
 import json
 import re
 import time
-from fuzzywuzzy import fuzz, process
+from multiprocessing import Pool
 from progress.bar import Bar
+from src.count_state import CountState
+from src.lemma_matcher import LemmaMatcher, compare_counts
+from src.matcher import KeywordIndex
+from src.phrases import PhraseMatcher
+from src.vocabulary import Vocabulary, init_scorer
+
+# Keyword structures of the current process, built once per worker by init_worker
+worker = {}
 
 def generate_empty_keywords_dict(keywords):
     """
@@ -23,31 +31,162 @@ def generate_empty_keywords_dict(keywords):
     return temp_dict
 
 
-def main(transcript_path, keywords_path, output_path):
+def init_worker(keywords, exact, vocabulary=None, modes=('fuzzy',)):
+    """
+    Builds the keyword structures used by count_transcript in the current process for the matching modes.
+    A Vocabulary already scored replaces the KeywordIndex when given
+    """
+    worker['keywords'] = keywords
+    worker['modes'] = modes
+    if 'fuzzy' in modes:
+        # Scores like process.extractBests with token_set_ratio, but only on indexed candidates
+        worker['matcher'] = vocabulary or KeywordIndex(keywords, score_cutoff=90, empty_match=True)
+        worker['phrases'] = PhraseMatcher(keywords) if exact else None
+    if 'lemma' in modes:
+        worker['lemma_matcher'] = LemmaMatcher(keywords)
+
+
+def count_fuzzy(transcript, words):
+    """Returns the dict of keyword -> list of occurrences found in the text of a transcript"""
+    if words is None:
+        # Tokenize the transcript text into words
+        words = re.findall(r'\b\w+\b', transcript["text"])
+
+    phrases = worker['phrases']
+    exact_matches = phrases.find(transcript["text"]) if phrases else {}
+    # Find occurences of keywords in the words with at least 90% confidence
+    matches = worker['matcher'].match(words)
+    # Exact occurrences first, fuzzy matching being a fallback for the keywords without any
+    return {**matches, **exact_matches}
+
+
+def count_transcript(item):
+    """
+    Counts the keyword occurrences of a (transcript, token ids) item, the token ids being None
+    when the transcript is tokenized here.
+    Returns for each mode a dict of keyword -> count without the zero counts
+    """
+    transcript, words = item
+    results = []
+    for mode in worker['modes']:
+        if mode == 'lemma':
+            matches = worker['lemma_matcher'].match(transcript.get("lemmas", []))
+        else:
+            matches = count_fuzzy(transcript, words)
+        counts = {}
+        for keyword in worker['keywords']:
+            count = len(matches.get(keyword, []))
+            if count:
+                counts[keyword] = counts.get(keyword, 0) + count
+        results.append(counts)
+    return results
+
+
+def main(transcript_path, keywords_path, output_path, vocabulary=False, cache_dir=None, exact=False, workers=1,
+         chunk_size=16, mode='fuzzy', compare_path=None, state_path=None, merge_paths=None):
+    """
+    Counts the occurrences of every keyword in all the transcripts.
+
+    vocabulary: scores each distinct word of all the transcripts once instead of once per transcript
+    cache_dir: directory caching the scores of the words for later runs, implies vocabulary
+    exact: counts the exact occurrences of keywords and phrases first, fuzzy matching single words
+           being only used for the keywords without any in a transcript
+           (off by default, it changes the counts of the fuzzy matching)
+    workers: number of processes counting the transcripts
+    chunk_size: number of transcripts sent at once to a worker
+    mode: 'fuzzy' to match the words of the text, 'lemma' to look up the lemmas of the transcripts
+    compare_path: runs both modes and saves how their keyword counts differ to this JSON file
+    state_path: state file of the per-file counts, only the transcripts it does not contain are counted
+                and the output covers every file of the state
+    merge_paths: state files of other shards merged into the state before counting
+    """
+    # The first mode is saved, the second one is only counted for the comparison
+    modes = [mode]
+    if compare_path:
+        modes.append('fuzzy' if mode == 'lemma' else 'lemma')
+
     start_time = time.perf_counter()
     print('[-] Importing data')
     # Load keywords and transcripts data from files
     with open(keywords_path, 'r', encoding='UTF-8') as file:
         keywords = json.load(file)
-    with open(transcript_path, 'r', encoding='UTF-8') as file:
-        transcripts = json.load(file)
+    transcripts = []
+    if transcript_path:
+        with open(transcript_path, 'r', encoding='UTF-8') as file:
+            transcripts = json.load(file)
+
+    # Counts of every file are kept by file in a state, files being counted once across runs and shards
+    state = None
+    if state_path or merge_paths:
+        state = CountState(state_path, keywords, {"mode": mode, "exact": exact, "score_cutoff": 90})
+        if not state.load():
+            print('[!] The state was computed with other keywords or options, counting every transcript again')
+        for merge_path in merge_paths or []:
+            added, conflicts = state.merge(merge_path)
+            print(f'[-] {added} files merged from {merge_path}')
+            for file in conflicts:
+                print(f'[!] {file} counted differently in {merge_path}, keeping the first counts')
+        counted = len(transcripts)
+        transcripts = [transcript for transcript in transcripts if transcript["file"] not in state.files]
+        print(f'[-] {counted - len(transcripts)} transcripts already counted, {len(transcripts)} new')
+
+    tabs = [None] * len(transcripts)
+    matcher = None
+    if (vocabulary or cache_dir) and 'fuzzy' in modes:
+        print('[-] Scoring vocabulary')
+        index = KeywordIndex(keywords, score_cutoff=90, empty_match=True)
+        matcher = Vocabulary(index, cache_dir)
+        # Tokenize the transcripts text into word ids
+        tabs = [matcher.tokens(re.findall(r'\b\w+\b', transcript["text"])) for transcript in transcripts]
+        if workers > 1:
+            with Pool(workers, initializer=init_scorer, initargs=(index,)) as pool:
+                cached, scored = matcher.score(pool)
+        else:
+            cached, scored = matcher.score()
+        print(f'[-] {len(matcher.words)} distinct words, {cached} read from cache, {scored} scored')
 
     print('[-] Generating statistics')
+    items = zip(transcripts, tabs)
+    pool = None
+    if workers > 1:
+        pool = Pool(workers, initializer=init_worker, initargs=(keywords, exact, matcher, modes))
+        results = pool.imap(count_transcript, items, chunksize=chunk_size)
+    else:
+        init_worker(keywords, exact, matcher, modes)
+        results = map(count_transcript, items)
+
     data = []
     with Bar('Processing', max=len(transcripts)) as bar:
-        occurences_dict = generate_empty_keywords_dict(keywords)
-        for transcript in transcripts:
-            # Tokenize the transcript text into words
-            words = re.findall(r'\b\w+\b', transcript["text"])
-            for keyword in keywords:
-                # Find occurences of keyword in the words with at least 90% confidence
-                result = process.extractBests(keyword, words, scorer=fuzz.token_set_ratio,
-                                              score_cutoff=90, limit=None)
-                occurences_dict[keyword] += len(result)
+        totals = [generate_empty_keywords_dict(keywords) for _ in modes]
+        # Counts are reduced in the order of the transcripts whatever the number of workers
+        for transcript, counts in zip(transcripts, results):
+            for occurences_dict, mode_counts in zip(totals, counts):
+                for keyword, count in mode_counts.items():
+                    occurences_dict[keyword] += count
+            if state:
+                state.add(transcript["file"], counts[0])
             bar.next()
-        data.append(occurences_dict)
         bar.finish()
 
+    if state:
+        data.append(state.totals(generate_empty_keywords_dict(keywords)))
+        if state_path:
+            state.save()
+    else:
+        data.append(totals[0])
+
+    if pool:
+        pool.close()
+        pool.join()
+
+    if compare_path:
+        counts = dict(zip(modes, totals))
+        differences = compare_counts(counts['lemma'], counts['fuzzy'])
+        print(f"[-] {sum(counts['lemma'].values())} occurrences in lemma mode, "
+              f"{sum(counts['fuzzy'].values())} in fuzzy mode, {len(differences)} keywords counted differently")
+        with open(compare_path, 'w', encoding='UTF-8') as file:
+            json.dump(differences, file, ensure_ascii=False)
+
     print('[-] Saving results')
     # Save the keyword occurences data to the output file
     with open(output_path, 'w+', encoding='UTF-8') as file:
@@ -57,12 +196,30 @@ def main(transcript_path, keywords_path, output_path):
     print("Duration:", end_time - start_time, "seconds")
 
 
-# Parse command line arguments
-parser = argparse.ArgumentParser(description='Counts keywords occurences for each audio files')
-parser.add_argument('--transcript', help='Path of the transcripts file', required=True)
-parser.add_argument('--keywords', help='Path of the keywords file', required=True)
-parser.add_argument('--output', help='Output path of the json file', default='output.json')
-args = parser.parse_args()
-
 if __name__ == "__main__":
-    main(args.transcript, args.keywords, args.output)
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Counts keywords occurences for each audio files')
+    parser.add_argument('--transcript', help='Path of the transcripts file', default=None)
+    parser.add_argument('--keywords', help='Path of the keywords file', required=True)
+    parser.add_argument('--output', help='Output path of the json file', default='output.json')
+    parser.add_argument('--vocabulary', help='Score each distinct word of all the transcripts once',
+                        action='store_true')
+    parser.add_argument('--cache', help='Directory of the word scores cache, implies --vocabulary', default=None)
+    parser.add_argument('--exact', help='Find the exact occurrences of keywords and phrases before fuzzy matching, '
+                                        'changes the counts', action='store_true')
+    parser.add_argument('--workers', help='Number of counting processes', type=int, default=1)
+    parser.add_argument('--chunk-size', help='Number of transcripts sent at once to a worker', type=int,
+                        default=16)
+    parser.add_argument('--mode', help='Match the words of the text or look up the lemmas of the transcripts',
+                        choices=['fuzzy', 'lemma'], default='fuzzy')
+    parser.add_argument('--compare', help='Path of a json file saving how the counts of both modes differ',
+                        default=None)
+    parser.add_argument('--state', help='Path of the state file of the per-file counts, only new transcripts are'
+                                        ' counted', default=None)
+    parser.add_argument('--merge', help='State files of other shards to merge', nargs='+', default=None)
+    args = parser.parse_args()
+    if not args.transcript and not args.merge:
+        parser.error('--transcript is required without --merge')
+
+    main(args.transcript, args.keywords, args.output, args.vocabulary, args.cache, args.exact,
+         args.workers, args.chunk_size, args.mode, args.compare, args.state, args.merge)
@@ -0,0 +1,129 @@
+#This script is used to measure the speed of the transcription pipeline without downloading a whisper model
+#It generates synthetic audio files and transcribes them with a stub model in every mode of STTBrain
+#It will save the throughput, real-time factor, time per stage and peak memory of every mode in a json file
+
+import argparse
+import json
+import queue
+import shutil
+import tempfile
+import time
+from multiprocessing import Process, Queue
+from os import path
+
+from src.benchmark import generate_dataset, StubLoader
+from src.stt import STTBrain
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, the peak memory is not reported
+    resource = None
+
+# STTBrain arguments of every mode
+MODES = {
+    'serial': {'prefetch': 0},
+    'prefetch': {'prefetch': 2},
+    'pipeline': {'pipeline': True},
+    'batched': {'window_batch': 8},
+    'workers': {}
+}
+
+
+"""
+    Returns the peak resident memory in MB of this process and of its finished children.
+"""
+def peak_rss():
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in KB on Linux
+    return round(max(own, children) / 1024, 1)
+
+
+"""
+    Runs one mode in its own process so the peak memory of every mode is measured separately.
+"""
+def run_mode(mode, files, workdir, cost, batch_cost, workers, output):
+    arguments = dict(MODES[mode])
+    if mode == 'workers':
+        arguments['workers'] = workers
+    output_file = path.join(workdir, f'{mode}.jsonl')
+    start = time.perf_counter()
+    stt = STTBrain(files, output_file, model='stub', processed=set(), model_loader=StubLoader(cost, batch_cost),
+                  **arguments)
+    stt.run()
+    duration = time.perf_counter() - start
+    stats = stt.stats
+    output.put({
+        "mode": mode,
+        "files": len(files),
+        "audio_seconds": round(stats['audio'], 3),
+        "wall_seconds": round(duration, 3),
+        "files_per_second": round(len(files) / duration, 3),
+        "real_time_factor": round(duration / stats['audio'], 4) if stats['audio'] else None,
+        "stages": {name: round(stats[name], 3) for name in ('decode', 'inference', 'lemmatization', 'checkpoint')},
+        "peak_rss_mb": peak_rss()
+    })
+
+
+def main(files, duration, cost, batch_cost, seed, modes, workers, output_file, workdir):
+    # Generating the synthetic dataset, kept between runs if a workdir is given
+    temporary = workdir is None
+    if temporary:
+        workdir = tempfile.mkdtemp(prefix='stt_benchmark_')
+    print('[-] Generating audio files')
+    audio_files = generate_dataset(path.join(workdir, 'database'), files, duration, seed)
+
+    results = []
+    try:
+        for mode in modes:
+            print(f'[-] Running {mode}')
+            output = Queue()
+            process = Process(target=run_mode,
+                              args=(mode, audio_files, workdir, cost, batch_cost, workers, output))
+            process.start()
+            # Waiting for the result as long as the mode is running
+            while True:
+                try:
+                    results.append(output.get(timeout=1))
+                    break
+                except queue.Empty:
+                    if not process.is_alive():
+                        print(f'[!] {mode} stopped without a result')
+                        break
+            process.join()
+    finally:
+        if temporary:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print('[-] Saving results')
+    with open(output_file, 'w', encoding='UTF-8') as file:
+        json.dump({
+            "config": {"files": files, "duration": duration, "cost": cost, "batch_cost": batch_cost, "seed": seed,
+                       "workers": workers},
+            "results": results
+        }, file, ensure_ascii=False, indent=2)
+    for result in results:
+        print(f"{result['mode']:>10} : {result['files_per_second']} files/s, real-time factor "
+              f"{result['real_time_factor']}, stages {result['stages']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmarks the transcription modes with a stub model')
+    parser.add_argument('--files', help='Number of synthetic audio files', type=int, default=20)
+    parser.add_argument('--duration', help='Duration of every audio file in seconds', type=float, default=60)
+    parser.add_argument('--cost', help='Seconds of CPU spent by the stub model per second of audio', type=float,
+                        default=0.05)
+    parser.add_argument('--batch_cost', help='Share of the cost of a window spent by the stub model for each '
+                                             'additional window of a batch, sets the speed-up of the batched mode',
+                        type=float, default=0.1)
+    parser.add_argument('--seed', help='Seed of the audio generator', type=int, default=0)
+    parser.add_argument('--modes', help='Modes to run', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--workers', help='Number of processes of the workers mode', type=int, default=4)
+    parser.add_argument('--output', help='Output path of the json file', default='benchmark.json')
+    parser.add_argument('--workdir', help='Folder keeping the synthetic dataset between runs', default=None)
+    args = parser.parse_args()
+    main(args.files, args.duration, args.cost, args.batch_cost, args.seed, args.modes, args.workers, args.output,
+         args.workdir)
@@ -0,0 +1,17 @@
+# This script is used to convert the jsonl file generated by transcripts/main into the json file
+# read by separateTranscript, string_matching and analytics
+# Records are copied one by one so the whole transcript file is never loaded in memory
+
+import argparse
+
+from src.checkpoint import convert_to_json
+
+# Parse the arguments passed to the script
+parser = argparse.ArgumentParser(description='Converts a jsonl transcripts file into a json file')
+parser.add_argument("jsonl_file", help="Path to the JSONL file")
+parser.add_argument("--output", help="Output path of the json file", default='output.json')
+args = parser.parse_args()
+
+if __name__ == "__main__":
+    count = convert_to_json(args.jsonl_file, args.output)
+    print(f'[-] {count} transcripts saved in {args.output}')
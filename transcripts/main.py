@@ -1,45 +1,46 @@
 #This script is used to turn audio files into readable text and lists of both lemmas and named entities
 #You can choose the model used for Speech to Text (https://github.com/openai/whisper)
-#It will generate the results in a json file
+#It will generate the results in a json file, or in a jsonl file appended to after every transcript
+#if the output ends with .jsonl (see convertTranscript.py to get the json file back)
 
 import argparse
 from os import path
-import json
 
 # Importing required modules from the src directory
 from src.path_finder import PathFinder
 from src.stt import STTBrain
+from src.checkpoint import read_processed_files
 
 
-def main(base_path, level, output_file):
+def main(base_path, level, output_file, workers=1, pipeline=False, batch_size=8, cache=None, cache_size=50000,
+         prefetch=2, prefetch_memory=2048, quantize=False, threads=None, interop_threads=None, language=None,
+         window_batch=0, manifest=None):
     """
     Main function that performs the speech-to-text transcription
     """
     print('[-] Searching for all folders')
     # Create an instance of PathFinder to find all folders containing audio files
-    finder = PathFinder(base_path)
+    finder = PathFinder(base_path, manifest)
     finder.run_finder()
     folders = finder.paths
 
     # Load any previous progress made in a previous run, if any
-    already_processed = []
-    jsoned_file = []
-    if path.isfile(output_file):
-        with open(output_file, 'r', encoding='UTF-8') as file:
-            jsoned_file = json.load(file, ensure_ascii=False)
-            for element in jsoned_file:
-                already_processed.append(element['file'])
+    # Only the file of every record is read
+    already_processed = read_processed_files(output_file)
 
     # Generate the path of the audio files that need to be transcribed
     audio_files = []
     for folder in folders:
-        audio_file = f'{path.normpath(folder).split(path.sep)[-1]}_audio.mp4'
+        audio_file = path.join(folder, f'{path.normpath(folder).split(path.sep)[-1]}_audio.mp4')
         if audio_file not in already_processed:
-            audio_files.append(path.join(folder, audio_file))
+            audio_files.append(audio_file)
 
     print('[-] Starting Speech To Text')
     # Create an instance of STTBrain to perform speech-to-text transcription
-    stt = STTBrain(audio_files, output_file, model=level, processed=already_processed)
+    stt = STTBrain(audio_files, output_file, model=level, processed=already_processed, workers=workers,
+                   pipeline=pipeline, batch_size=batch_size, cache=cache, cache_size=cache_size,
+                   prefetch=prefetch, prefetch_memory=prefetch_memory, quantize=quantize, threads=threads,
+                   interop_threads=interop_threads, language=language, window_batch=window_batch)
     stt.run()
 
 
@@ -47,8 +48,25 @@ if __name__ == "__main__":
     # Argument parser to parse command-line arguments
     parser = argparse.ArgumentParser(description='Generates transcripts of audio files from the database')
     parser.add_argument('--base_path', help='Root path of the database', required=True)
-    parser.add_argument('--output', help='Output path of the json file', default='output.json')
+    parser.add_argument('--output', help='Output path of the json or jsonl file', default='output.json')
     parser.add_argument('--level', help='Level of STT', default='base')
+    parser.add_argument('--workers', help='Number of transcription processes', type=int, default=1)
+    parser.add_argument('--pipeline', help='Decode, transcribe and lemmatize in separate stages', action='store_true')
+    parser.add_argument('--batch_size', help='Number of transcripts lemmatized at once with --pipeline', type=int, default=8)
+    parser.add_argument('--cache', help='Path of the SQLite cache of transcripts, keyed by audio content', default=None)
+    parser.add_argument('--cache_size', help='Maximum number of transcripts kept in the cache', type=int, default=50000)
+    parser.add_argument('--prefetch', help='Number of audio files decoded in advance', type=int, default=2)
+    parser.add_argument('--prefetch_memory', help='Maximum size in MB of the audio decoded in advance', type=int,
+                        default=2048)
+    parser.add_argument('--quantize', help='Quantize the model to int8 for CPU inference', action='store_true')
+    parser.add_argument('--threads', help='Torch threads per process', type=int, default=None)
+    parser.add_argument('--interop_threads', help='Torch inter-op threads per process', type=int, default=None)
+    parser.add_argument('--language', help='Language of the audio (ex: fr), skips the language detection', default=None)
+    parser.add_argument('--window_batch', help='Number of 30 seconds windows of different files decoded at once',
+                        type=int, default=0)
+    parser.add_argument('--manifest', help='Json file keeping the folder tree between runs', default=None)
     args = parser.parse_args()
-    main(args.base_path, args.level, args.output)
+    main(args.base_path, args.level, args.output, args.workers, args.pipeline, args.batch_size, args.cache,
+         args.cache_size, args.prefetch, args.prefetch_memory, args.quantize, args.threads, args.interop_threads,
+         args.language, args.window_batch, args.manifest)
     
\ No newline at end of file
@@ -1,40 +1,65 @@
 # This script is used to separate all transcripts object stored in the transcripts.json file
-# It needs the transcript file and will generate a json file for every transcript and will store
+# It needs the transcript file (json or jsonl) and will generate a json file for every transcript and will store
 # them in the same hierarchy as the original database
+# The transcripts are read one at a time and written by a small pool of threads, so memory stays flat
 
 import os
 import json
-import time
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore
+
+from src.checkpoint import iter_records
 
 # Parse the arguments passed to the script
 parser = argparse.ArgumentParser()
-parser.add_argument("json_file", help="Path to the JSON file")
+parser.add_argument("json_file", help="Path to the JSON or JSONL file")
+parser.add_argument("--threads", help="Number of threads writing the files", type=int, default=4)
 args = parser.parse_args()
 
-# Load the JSON file
-with open(args.json_file, "r", encoding="utf-8") as f:
-    data = json.load(f)
 
-# Confirm that the JSON file has been loaded
-print("JSON loaded")
+def write_transcript(directory, timestamp, item):
+    """Writes the JSON data of one transcript in its folder"""
+    with open(f"{directory}/{timestamp}_transcript.json", "w", encoding="utf-8") as f:
+        json.dump(item, f)
 
-# Iterate over each item in the JSON data
-for item in data:
-    file_path = item["file"]
 
-    # Get the current timestamp as a string
-    timestamp = str(int(time.time()))
+def finished(future, file_path, slots):
+    """Frees the slot of a written transcript and reports a failed write"""
+    slots.release()
+    if future.exception() is not None:
+        print(f"[!] Could not write the transcript of {file_path} : {future.exception()}")
 
-    # Split the file path into the directory and filename
-    directory, filename = os.path.split(file_path)
 
-    # Remove the "F:/" part from the directory path
-    directory = directory[3:]
+def main(json_file, threads):
+    # Limiting the transcripts waiting to be written so they don't pile up in memory
+    slots = BoundedSemaphore(threads * 4)
+    count = 0
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        # Iterate over each item of the file, loaded one at a time
+        for item in iter_records(json_file):
+            file_path = item["file"]
 
-    # Create the directory hierarchy, if it does not exist
-    os.makedirs(directory, exist_ok=True)
+            # Split the file path into the directory and filename
+            directory, filename = os.path.split(file_path)
 
-    # Write the JSON data for each item to a file
-    with open(f"{directory}/{timestamp}_transcript.json", "w", encoding="utf-8") as f:
-        json.dump(item, f)
+            # The audio file is named <timestamp>_audio.mp4 and its folder is unique,
+            # so its timestamp names the transcript without collision
+            timestamp = filename.split("_audio")[0]
+
+            # Remove the "F:/" part from the directory path
+            directory = directory[3:]
+
+            # Create the directory hierarchy, if it does not exist
+            os.makedirs(directory, exist_ok=True)
+
+            # Write the JSON data for each item to a file
+            slots.acquire()
+            future = executor.submit(write_transcript, directory, timestamp, item)
+            future.add_done_callback(lambda done, path=file_path: finished(done, path, slots))
+            count += 1
+    print(f"{count} transcripts written")
+
+
+if __name__ == "__main__":
+    main(args.json_file, args.threads)
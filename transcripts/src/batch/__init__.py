@@ -0,0 +1 @@
+from .main import BatchTranscriber
\ No newline at end of file
@@ -0,0 +1,166 @@
+import dataclasses
+import time
+from collections import deque
+
+import torch
+import whisper
+from whisper.audio import N_SAMPLES, SAMPLE_RATE
+
+
+class BatchTranscriber:
+    """
+        Transcribes many audio files by cutting them in 30 seconds windows and decoding windows
+        of different files together, so the encoder and the decoder run on full batches.
+        Windows are fixed, unlike model.transcribe which moves the next window to the last timestamp,
+        so a word cut by a window boundary can be lost.
+        Like model.transcribe, windows whose text is too repetitive or whose average log probability is too low
+        are decoded again with the next temperature, the windows of a batch needing it being decoded together.
+
+        :param model: Loaded whisper model.
+        :param batch_size: Number of windows decoded at once.
+        :param options: Options given to model.transcribe (fp16, language, temperature and the thresholds),
+                        converted to DecodingOptions.
+    """
+    def __init__(self, model, batch_size=8, options=None):
+        options = options or {}
+        self.model = model
+        self.batch_size = batch_size
+        self.n_mels = getattr(model.dims, 'n_mels', 80)
+        self.decoding = whisper.DecodingOptions(language=options.get('language'), fp16=options.get('fp16', False),
+                                                without_timestamps=True)
+        # Same defaults as model.transcribe
+        temperature = options.get('temperature', (0.0, 0.2, 0.4, 0.6, 0.8, 1.0))
+        self.temperatures = tuple(temperature) if isinstance(temperature, (list, tuple)) else (temperature,)
+        self.compression_ratio_threshold = options.get('compression_ratio_threshold', 2.4)
+        self.logprob_threshold = options.get('logprob_threshold', -1.0)
+        self.no_speech_threshold = options.get('no_speech_threshold', 0.6)
+        # Seconds spent computing the spectrograms and decoding
+        self.inference_time = 0.0
+
+    """
+        Cuts an audio array in 30 seconds windows.
+
+        :param audio: 16 kHz audio array.
+        :return: A generator of (start, end, audio) tuples, start and end in seconds.
+    """
+    def _windows(self, audio):
+        for start in range(0, len(audio), N_SAMPLES):
+            end = min(start + N_SAMPLES, len(audio))
+            yield start / SAMPLE_RATE, end / SAMPLE_RATE, audio[start:end]
+
+    """
+        Tells if a window has to be decoded again with a higher temperature, with the thresholds of model.transcribe.
+
+        :param result: DecodingResult of the window.
+        :return: True if its text is too repetitive or unlikely, unless the window is silent.
+    """
+    def _needs_fallback(self, result):
+        if self._silent(result):
+            return False
+        if self.compression_ratio_threshold is not None and result.compression_ratio > self.compression_ratio_threshold:
+            return True
+        return self.logprob_threshold is not None and result.avg_logprob < self.logprob_threshold
+
+    """
+        Tells if a window is silent, with the thresholds of model.transcribe.
+
+        :param result: DecodingResult of the window.
+        :return: True if the window has no speech.
+    """
+    def _silent(self, result):
+        if self.no_speech_threshold is None or result.no_speech_prob <= self.no_speech_threshold:
+            return False
+        return self.logprob_threshold is None or result.avg_logprob <= self.logprob_threshold
+
+    """
+        Decodes spectrograms with the first temperature, then decodes again together the windows needing it
+        with each next temperature.
+
+        :param mels: Batch of log-mel spectrograms.
+        :return: The list of DecodingResult.
+    """
+    def _decode_with_fallback(self, mels):
+        decoding = dataclasses.replace(self.decoding, temperature=self.temperatures[0])
+        results = list(self.model.decode(mels, decoding))
+        for temperature in self.temperatures[1:]:
+            retry = [index for index, result in enumerate(results) if self._needs_fallback(result)]
+            if not retry:
+                break
+            decoding = dataclasses.replace(self.decoding, temperature=temperature)
+            for index, result in zip(retry, self.model.decode(torch.stack([mels[index] for index in retry]),
+                                                              decoding)):
+                results[index] = result
+        return results
+
+    """
+        Decodes a batch of windows and stores the segments in their file.
+
+        :param batch: List of (entry, index, start, end, audio) tuples.
+    """
+    def _decode(self, batch):
+        start_time = time.perf_counter()
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), self.n_mels) for _, _, _, _, audio in batch
+        ]).to(self.model.device)
+        results = self._decode_with_fallback(mels)
+        self.inference_time += time.perf_counter() - start_time
+
+        for (entry, index, start, end, _), result in zip(batch, results):
+            # Same silence detection as model.transcribe, on the result kept after the temperature fallback
+            silent = self._silent(result)
+            entry['segments'][index] = {
+                "id": index,
+                "start": start,
+                "end": end,
+                "text": '' if silent else result.text,
+                "avg_logprob": result.avg_logprob,
+                "no_speech_prob": result.no_speech_prob
+            }
+            entry['remaining'] -= 1
+
+    """
+        Yields the files at the front of the queue whose windows are all decoded.
+
+        :param pending: Queue of files being transcribed, in input order.
+    """
+    def _completed(self, pending):
+        while pending and pending[0]['queued'] and pending[0]['remaining'] == 0:
+            entry = pending.popleft()
+            result = None
+            if entry['has_audio']:
+                segments = [segment for segment in entry['segments'] if segment['text']]
+                result = {
+                    "text": ' '.join(segment['text'] for segment in segments),
+                    "segments": segments
+                }
+            yield entry['file'], result, entry['extra']
+
+    """
+        Transcribes audio files, reading them lazily so only the files being decoded stay in memory.
+
+        :param items: Iterable of (file, audio, extra) tuples, files with a None audio are passed through.
+        :return: A generator of (file, result, extra) tuples in input order, result has the text and
+                 segments keys like model.transcribe, or is None when the audio is None.
+    """
+    def transcribe(self, items):
+        pending = deque()
+        batch = []
+        for file, audio, extra in items:
+            entry = {'file': file, 'extra': extra, 'segments': [], 'remaining': 0, 'queued': False,
+                     'has_audio': audio is not None}
+            pending.append(entry)
+            if audio is not None:
+                for index, (start, end, window) in enumerate(self._windows(audio)):
+                    entry['segments'].append(None)
+                    entry['remaining'] += 1
+                    batch.append((entry, index, start, end, window))
+                    if len(batch) == self.batch_size:
+                        self._decode(batch)
+                        batch = []
+                        yield from self._completed(pending)
+            entry['queued'] = True
+            yield from self._completed(pending)
+        # Decoding the last incomplete batch
+        if batch:
+            self._decode(batch)
+        yield from self._completed(pending)
@@ -0,0 +1 @@
+from .main import generate_dataset, StubLoader, StubModel
\ No newline at end of file
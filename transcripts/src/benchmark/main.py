@@ -0,0 +1,140 @@
+import math
+import random
+import time
+import wave
+from array import array
+from os import makedirs, path
+
+import whisper
+from whisper.audio import SAMPLE_RATE
+
+# Words used by the stub model to build its transcripts
+WORDS = [
+    'le', 'la', 'les', 'de', 'des', 'et', 'un', 'une', 'président', 'élection', 'candidat', 'campagne',
+    'retraite', 'réforme', 'pouvoir', 'achat', 'gouvernement', 'ministre', 'assemblée', 'vote', 'sondage',
+    'débat', 'programme', 'économie', 'santé', 'école', 'sécurité', 'europe', 'guerre', 'ukraine', 'prix',
+    'énergie', 'climat', 'travail', 'salaire', 'jeunes', 'français', 'france', 'paris', 'région'
+]
+
+
+"""
+    Generates a deterministic tree of synthetic audio files with the same layout as the database,
+    every leaf folder <timestamp> contains a <timestamp>_audio.mp4 file holding 16 kHz WAV data (ffmpeg reads the content).
+
+    :param root: Folder receiving the dataset.
+    :param files: Number of audio files.
+    :param duration: Duration of every file in seconds.
+    :param seed: Seed of the generator.
+    :return: The list of generated audio files.
+"""
+def generate_dataset(root, files, duration, seed=0):
+    generator = random.Random(seed)
+    audio_files = []
+    for index in range(files):
+        timestamp = f'{1646136000 + index * 3600}'
+        folder = path.join(root, f'202203{1 + index // 24:02d}', timestamp)
+        makedirs(folder, exist_ok=True)
+        audio_file = path.join(folder, f'{timestamp}_audio.mp4')
+        if not path.isfile(audio_file):
+            _write_wave(audio_file, duration, generator.random())
+        audio_files.append(audio_file)
+    return audio_files
+
+
+"""
+    Writes a mono 16 bits WAV file made of a few tones and some noise.
+"""
+def _write_wave(audio_file, duration, seed):
+    generator = random.Random(seed)
+    frequencies = [generator.uniform(100, 1000) for _ in range(3)]
+    samples = array('h')
+    for i in range(int(duration * SAMPLE_RATE)):
+        t = i / SAMPLE_RATE
+        value = sum(math.sin(2 * math.pi * frequency * t) for frequency in frequencies) / 3
+        value += generator.uniform(-0.1, 0.1)
+        samples.append(int(max(-1.0, min(1.0, value)) * 16000))
+    with wave.open(audio_file, 'wb') as output:
+        output.setnchannels(1)
+        output.setsampwidth(2)
+        output.setframerate(SAMPLE_RATE)
+        output.writeframes(samples.tobytes())
+
+
+class StubModel:
+    """
+        Stands in for a whisper model, spends cost seconds of CPU per second of audio and returns
+        a deterministic French text of 2.5 words per second.
+        A batch of windows costs one window plus batch_cost of a window for each other window, as the batched
+        matrix products of the real model use the hardware better than one window at a time.
+        The speed-up of the batched mode only reflects this assumed ratio, not a measure of whisper.
+
+        :param cost: Seconds of CPU spent per second of audio.
+        :param batch_cost: Share of the cost of a window spent for each additional window of a batch.
+    """
+    def __init__(self, cost=0.05, batch_cost=0.1):
+        self.cost = cost
+        self.batch_cost = batch_cost
+        self.device = 'cpu'
+        self.dims = type('Dims', (), {'n_mels': 80})()
+
+    """
+        Keeps a core busy like the real model would, sleeping would let the workers scale for free.
+    """
+    def _spend(self, seconds):
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            pass
+
+    """
+        Returns the text of an audio of the given number of samples.
+    """
+    def _text(self, samples):
+        generator = random.Random(samples)
+        return ' '.join(generator.choice(WORDS) for _ in range(int(samples / SAMPLE_RATE * 2.5)))
+
+    """
+        Same interface as model.transcribe.
+    """
+    def transcribe(self, audio, **options):
+        if isinstance(audio, str):
+            audio = whisper.load_audio(audio)
+        duration = len(audio) / SAMPLE_RATE
+        self._spend(duration * self.cost)
+        text = self._text(len(audio))
+        return {
+            "text": text,
+            "segments": [{"id": 0, "start": 0.0, "end": duration, "text": text}],
+            "language": options.get('language') or 'fr'
+        }
+
+    """
+        Same interface as model.decode on a batch of 30 seconds spectrograms,
+        a window costs 30 seconds of audio like the real encoder which always runs on padded windows,
+        the other windows of the batch adding batch_cost of that each.
+    """
+    def decode(self, mels, options):
+        self._spend(30 * self.cost * (1 + self.batch_cost * (len(mels) - 1)))
+        results = []
+        for _ in mels:
+            results.append(type('DecodingResult', (), {
+                'text': self._text(30 * SAMPLE_RATE + len(results)),
+                'avg_logprob': -0.2,
+                'compression_ratio': 1.5,
+                'no_speech_prob': 0.01
+            })())
+        return results
+
+
+class StubLoader:
+    """
+        Picklable replacement of whisper.load_model returning a StubModel, so it can be sent to the workers.
+
+        :param cost: Seconds of CPU spent per second of audio.
+        :param batch_cost: Share of the cost of a window spent for each additional window of a batch.
+    """
+    def __init__(self, cost=0.05, batch_cost=0.1):
+        self.cost = cost
+        self.batch_cost = batch_cost
+
+    def __call__(self, name, device=None):
+        return StubModel(self.cost, self.batch_cost)
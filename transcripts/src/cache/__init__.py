@@ -0,0 +1 @@
+from .main import TranscriptCache
\ No newline at end of file
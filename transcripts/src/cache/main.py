@@ -0,0 +1,101 @@
+import hashlib
+import json
+import sqlite3
+import time
+from threading import Lock
+
+
+class TranscriptCache:
+    """
+        SQLite cache of transcripts keyed by the content of the audio file and the model settings.
+        A rebroadcast or a file moved to another folder or drive is found again without running whisper.
+
+        :param db_path: Path of the SQLite database, created if it does not exist.
+        :param model: Name of the whisper model.
+        :param options: Decoding options given to whisper, part of the key.
+        :param max_entries: Maximum number of transcripts kept, the least recently used are removed.
+    """
+    def __init__(self, db_path, model, options, max_entries=50000):
+        self.settings = json.dumps({"model": model, "options": options}, sort_keys=True)
+        self.max_entries = max_entries
+        # Waiting on the lock when several worker processes share the database,
+        # the connection is shared by the pipeline threads behind self.lock
+        self.connection = sqlite3.connect(db_path, timeout=60, check_same_thread=False)
+        self.lock = Lock()
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS transcripts (
+                key TEXT PRIMARY KEY,
+                text TEXT,
+                segments TEXT,
+                lemmas TEXT,
+                named_entities TEXT,
+                last_used REAL
+            )
+        ''')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS transcripts_last_used ON transcripts (last_used)')
+        self.connection.commit()
+
+    """
+        Computes the key of an audio file from its content and the model settings.
+
+        :param file: Path of the audio file.
+        :return: The hexadecimal key.
+    """
+    def key(self, file):
+        digest = hashlib.sha256(self.settings.encode('UTF-8'))
+        with open(file, 'rb') as audio:
+            for chunk in iter(lambda: audio.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    """
+        Returns the cached transcript of a key and marks it as recently used.
+
+        :param key: Key computed by key().
+        :return: A dict with text, segments, lemmas and named_entities, None if the key is not cached.
+    """
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT text, segments, lemmas, named_entities FROM transcripts WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute('UPDATE transcripts SET last_used = ? WHERE key = ?', (time.time(), key))
+            self.connection.commit()
+        return {
+            "text": row[0],
+            "segments": json.loads(row[1]),
+            "lemmas": json.loads(row[2]),
+            "named_entities": json.loads(row[3])
+        }
+
+    """
+        Stores a transcript then removes the least recently used ones above max_entries.
+
+        :param key: Key computed by key().
+        :param text: Text of the transcript.
+        :param segments: Segments returned by whisper.
+        :param lemmas: Lemmas of the text.
+        :param named_entities: Named entities of the text.
+    """
+    def put(self, key, text, segments, lemmas, named_entities):
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO transcripts VALUES (?, ?, ?, ?, ?, ?)',
+                (key, text, json.dumps(segments, ensure_ascii=False), json.dumps(lemmas, ensure_ascii=False),
+                 json.dumps(named_entities, ensure_ascii=False), time.time())
+            )
+            self.connection.execute('''
+                DELETE FROM transcripts WHERE key IN (
+                    SELECT key FROM transcripts ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+            self.connection.commit()
+
+    """
+        Closes the database.
+    """
+    def close(self):
+        self.connection.close()
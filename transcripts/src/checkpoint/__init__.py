@@ -0,0 +1 @@
+from .main import JSONLWriter, read_processed_files, convert_to_json, iter_records
\ No newline at end of file
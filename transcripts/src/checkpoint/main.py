@@ -0,0 +1,179 @@
+import json
+import os
+from os import path
+
+# Every record written by JSONLWriter starts with this prefix so the file name can be read alone
+FILE_PREFIX = '{"file": '
+decoder = json.JSONDecoder()
+
+
+class JSONLWriter:
+    """
+        Append-only writer saving one transcript record per line.
+        Every record is flushed and synced to the disk so a crash loses at most the record being written.
+
+        :param output_file: Path of the JSONL file, created if it does not exist.
+    """
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self._repair()
+        self.file = open(output_file, 'a', encoding='UTF-8')
+
+    """
+        Removes the partial last line left by a crash so the next record starts on a clean line.
+    """
+    def _repair(self):
+        if not path.isfile(self.output_file):
+            return
+        with open(self.output_file, 'rb+') as file:
+            size = file.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            file.seek(size - 1)
+            if file.read(1) == b'\n':
+                return
+            # Looking backward for the end of the last complete line
+            position = size
+            while position > 0:
+                step = min(65536, position)
+                position -= step
+                file.seek(position)
+                chunk = file.read(step)
+                newline = chunk.rfind(b'\n')
+                if newline != -1:
+                    file.truncate(position + newline + 1)
+                    return
+            file.truncate(0)
+
+    """
+        Appends a record to the file and syncs it to the disk.
+
+        :param record: The transcript record, its first key must be "file".
+    """
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    """
+        Closes the output file.
+    """
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+"""
+    Reads the file field of a JSONL line without decoding the text, lemmas and named entities.
+
+    :param line: A line of the JSONL file.
+    :return: The file of the record, None if the line is not a complete record.
+"""
+def _read_file_field(line):
+    try:
+        if line.startswith(FILE_PREFIX):
+            return decoder.raw_decode(line, len(FILE_PREFIX))[0]
+        return json.loads(line)['file']
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+"""
+    Reads the records of a transcript file one at a time, JSONL or JSON array,
+    so memory does not grow with the size of the file.
+
+    :param input_file: Path of the JSONL or JSON file.
+    :param chunk_size: Number of characters read at once from a JSON array.
+    :return: A generator of records.
+"""
+def iter_records(input_file, chunk_size=1 << 20):
+    with open(input_file, 'r', encoding='UTF-8') as file:
+        if input_file.endswith('.jsonl'):
+            for line in file:
+                # Skipping the partial line left by a crash
+                if line.endswith('\n') and line.strip():
+                    yield json.loads(line)
+            return
+
+        buffer = ''
+        position = 0
+        started = False
+        while True:
+            # Skipping the separators between the records
+            while position < len(buffer) and (buffer[position].isspace() or buffer[position] in ',]'
+                                              or (not started and buffer[position] == '[')):
+                started = started or buffer[position] == '['
+                position += 1
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+                yield record
+                continue
+            except ValueError:
+                pass
+            # The next record is not complete, reading more of the file
+            chunk = file.read(chunk_size)
+            buffer = buffer[position:] + chunk
+            position = 0
+            if not chunk:
+                if buffer.strip():
+                    raise ValueError(f'Incomplete record at the end of {input_file}')
+                return
+
+
+"""
+    Returns the set of files already saved in the output file, JSONL or legacy JSON array.
+
+    :param output_file: Path of the output file.
+    :return: A set of file paths.
+"""
+def read_processed_files(output_file):
+    processed = set()
+    if not path.isfile(output_file):
+        return processed
+    if not output_file.endswith('.jsonl'):
+        for element in iter_records(output_file):
+            processed.add(element['file'])
+        return processed
+    with open(output_file, 'r', encoding='UTF-8') as file:
+        for line in file:
+            # A line without its newline was being written during a crash
+            if not line.endswith('\n'):
+                continue
+            file_name = _read_file_field(line)
+            if file_name is not None:
+                processed.add(file_name)
+    return processed
+
+
+"""
+    Converts a JSONL transcript file into the JSON array read by the other tools.
+    Records are copied one at a time so the whole file is never loaded in memory.
+
+    :param jsonl_file: Path of the JSONL file.
+    :param json_file: Path of the JSON file to write.
+    :return: The number of records written.
+"""
+def convert_to_json(jsonl_file, json_file):
+    count = 0
+    with open(jsonl_file, 'r', encoding='UTF-8') as source, open(json_file, 'w', encoding='UTF-8') as output:
+        output.write('[')
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                json.loads(line)
+            except ValueError:
+                # Skipping a record left incomplete by a crash
+                continue
+            if count > 0:
+                output.write(', ')
+            output.write(line)
+            count += 1
+        output.write(']')
+    return count
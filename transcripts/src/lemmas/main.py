@@ -26,10 +26,7 @@ class Lemmatizor:
     def get_lemmas(self):
 
         if self.processed:
-            return [
-                lemma.lemma_ for lemma in self.processed
-                if lemma.lemma_ not in self.stop_words
-            ]
+            return self._lemmas(self.processed)
         return []
 
     """
@@ -40,5 +37,32 @@ class Lemmatizor:
     def get_named_entities(self):
 
         if self.processed:
-            return [ent.lemma_ for ent in self.processed.ents]
+            return self._named_entities(self.processed)
         return []
+
+    """
+        Process many sentences at once with spacy nlp.pipe, much faster than one call per sentence.
+
+        :param sentences: An iterable of sentences.
+        :param batch_size: Number of sentences given to the model at once.
+        :return: A generator of (lemmas, named entities) tuples, in the order of the sentences.
+    """
+    def process_batch(self, sentences, batch_size=8):
+
+        for doc in self.nlp.pipe(sentences, batch_size=batch_size):
+            yield self._lemmas(doc), self._named_entities(doc)
+
+    """
+        Get the lemmas of a spacy document, filtering out stop words.
+    """
+    def _lemmas(self, doc):
+        return [
+            lemma.lemma_ for lemma in doc
+            if lemma.lemma_ not in self.stop_words
+        ]
+
+    """
+        Get the lemmatized named entities of a spacy document.
+    """
+    def _named_entities(self, doc):
+        return [ent.lemma_ for ent in doc.ents]
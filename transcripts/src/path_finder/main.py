@@ -1,34 +1,64 @@
-from os import listdir, path
+import json
+import os
+from os import path, scandir
+
 
 class PathFinder:
     """
         Initialize the class with base_path, the starting directory to look for folders.
 
         :param base_path: The base path to start the directory search from.
+        :param manifest: Optional json file keeping the folder tree between runs. Defaults to None.
     """
-    def __init__(self, base_path):
+    def __init__(self, base_path, manifest=None):
         self.base_path = base_path
         self.paths = set()
+        self.manifest = manifest
 
     """
         A helper function to list all the directories in the current_folder.
 
         :param current_folder: The current folder to search for subdirectories.
-        :param folders_and_files: A list of elements in the current_folder.
-        :return: A set of subdirectories found in the current_folder.
-    """
-    def _list_dirs(self, current_folder, folders_and_files):
-        folders = set()
-        # Iterate over all elements in the folder to check if they are directories
-        for element in folders_and_files:
-            current_path = path.join(current_folder, element)
-            if path.isdir(current_path):
-                folders.add(current_path)
+        :return: A list of subdirectories found in the current_folder.
+    """
+    def _list_dirs(self, current_folder):
+        folders = []
+        # The type of every element comes with the directory entry, no stat is needed per element
+        with scandir(current_folder) as elements:
+            for element in elements:
+                if element.is_dir():
+                    folders.append(element.path)
         # Return all the directories found in the current_folder
         return folders
 
     """
-        The main function to run the directory search.
+        Loads the folders saved by a previous run, if the manifest exists and was made from the same base path.
+
+        :return: A dict of folder -> [modification time, subdirectories].
+    """
+    def _load_manifest(self):
+        if self.manifest is None or not path.isfile(self.manifest):
+            return {}
+        with open(self.manifest, 'r', encoding='UTF-8') as file:
+            content = json.load(file)
+        if content.get('base_path') != self.base_path:
+            return {}
+        return content['folders']
+
+    """
+        Saves the folder tree in the manifest, written to a temporary file first so a crash cannot corrupt it.
+
+        :param folders: A dict of folder -> [modification time, subdirectories].
+    """
+    def _save_manifest(self, folders):
+        temporary_file = f'{self.manifest}.tmp'
+        with open(temporary_file, 'w', encoding='UTF-8') as file:
+            json.dump({"base_path": self.base_path, "folders": folders}, file, ensure_ascii=False)
+        os.replace(temporary_file, self.manifest)
+
+    """
+        The main function to run the directory search, folders without subdirectories are added to paths.
+        With a manifest, the folders whose modification time did not change are not listed again.
 
         :param starting_point: The starting point for the directory search.
         :return: None
@@ -37,13 +67,23 @@ class PathFinder:
         # If no starting point is provided, use the base_path as the starting point
         if starting_point is None:
             starting_point = self.base_path
-        # List all the directories in the current folder
-        folders = self._list_dirs(starting_point, listdir(starting_point))
-        # If there are no more directories, add the current folder to the paths set
-        if len(folders) == 0:
-            self.paths.add(starting_point)
-            return
-        # For each directory found, call run_finder again with the directory as the new starting point
-        for folder in folders:
-            next_path = path.join(starting_point, folder)
-            self.run_finder(starting_point=next_path)
+        known_folders = self._load_manifest()
+        folders = {}
+        # Iterative walk, a deep tree cannot reach the recursion limit
+        to_visit = [starting_point]
+        while to_visit:
+            current_folder = to_visit.pop()
+            modification_time = os.stat(current_folder).st_mtime_ns
+            known = known_folders.get(current_folder)
+            # Adding or removing an element changes the modification time of its folder
+            if known is not None and known[0] == modification_time:
+                subfolders = known[1]
+            else:
+                subfolders = self._list_dirs(current_folder)
+            folders[current_folder] = [modification_time, subfolders]
+            # If there are no more directories, add the current folder to the paths set
+            if len(subfolders) == 0:
+                self.paths.add(current_folder)
+            to_visit.extend(subfolders)
+        if self.manifest is not None:
+            self._save_manifest(folders)
@@ -0,0 +1 @@
+from .main import AudioPrefetcher
\ No newline at end of file
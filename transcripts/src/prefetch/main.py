@@ -0,0 +1,88 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AudioPrefetcher:
+    """
+        Loads the next files in a thread pool while the current one is being transcribed.
+        ffmpeg runs in a subprocess so the decoding overlaps with the inference instead of adding to it.
+
+        :param files: List of files to load, in order.
+        :param loader: Function called on every file, returns the loaded value (decoded audio).
+        :param ahead: Maximum number of files loaded in advance, 0 loads every file when it is needed.
+        :param memory_budget: Maximum number of bytes of loaded arrays waiting to be used, at least one file is always loaded.
+            A file being loaded counts as the largest file loaded so far.
+    """
+    def __init__(self, files, loader, ahead=2, memory_budget=2 * 1024 ** 3):
+        self.files = files
+        self.loader = loader
+        self.ahead = ahead
+        self.memory_budget = memory_budget
+        # Largest loaded value seen, reserved for each file still being loaded
+        self.largest = None
+
+    """
+        Returns the number of bytes used by a loaded value, counting every numpy array it contains.
+    """
+    def _size(self, value):
+        if hasattr(value, 'nbytes'):
+            return value.nbytes
+        if isinstance(value, (tuple, list)):
+            return sum(self._size(element) for element in value)
+        return 0
+
+    """
+        Returns the number of bytes held by the files already loaded and not used yet, plus the size of the
+        largest file loaded so far for each file still being loaded.
+    """
+    def _held(self, pending):
+        held = 0
+        for _, future in pending:
+            if not future.done():
+                held += self.largest
+            elif future.exception() is None:
+                held += self._record(future.result())
+        return held
+
+    """
+        Returns the number of bytes used by a loaded value and keeps the largest one.
+    """
+    def _record(self, value):
+        size = self._size(value)
+        self.largest = size if self.largest is None else max(self.largest, size)
+        return size
+
+    """
+        Yields (file, value, error) tuples in the order of the files, value is None when the loader raised error.
+    """
+    def __iter__(self):
+        if self.ahead <= 0:
+            for file in self.files:
+                try:
+                    yield file, self.loader(file), None
+                except Exception as error:
+                    yield file, None, error
+            return
+
+        files = iter(self.files)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.ahead) as executor:
+            while True:
+                # Loading ahead while the waiting arrays and the next one stay under the memory budget,
+                # one file at a time until the size of a loaded file is known
+                while len(pending) < self.ahead and (not pending or self.largest is not None and
+                                                     self._held(pending) + self.largest <= self.memory_budget):
+                    file = next(files, None)
+                    if file is None:
+                        break
+                    pending.append((file, executor.submit(self.loader, file)))
+                if not pending:
+                    return
+                file, future = pending.popleft()
+                try:
+                    value = future.result()
+                except Exception as error:
+                    yield file, None, error
+                    continue
+                self._record(value)
+                yield file, value, None
@@ -1,9 +1,206 @@
 import json
-from os import path
+import time
+from os import path, cpu_count
+from multiprocessing import Process, Queue
+import queue
+from threading import Thread, Lock
+import torch
 import whisper
-from threading import Thread
 from progress.bar import Bar
 from src.lemmas import Lemmatizor
+from src.checkpoint import JSONLWriter
+from src.cache import TranscriptCache
+from src.prefetch import AudioPrefetcher
+from src.batch import BatchTranscriber
+
+# Options given to model.transcribe, also part of the cache key
+DECODE_OPTIONS = {"fp16": False}
+
+
+"""
+    Loads a whisper model, optionally quantized to int8 for CPU inference
+
+    Parameters:
+    name (str): Name of the whisper model
+    quantize (bool, optional): Applies dynamic int8 quantization to the linear layers. Defaults to False.
+    loader (function, optional): Function loading the model from its name. Defaults to None (whisper.load_model).
+
+    Returns:
+    The loaded model
+"""
+def load_model(name, quantize=False, loader=None):
+    if loader is None:
+        loader = whisper.load_model
+    if not quantize:
+        return loader(name)
+    # Quantized layers only run on CPU
+    model = loader(name, device='cpu')
+    # Whisper subclasses nn.Linear only to cast the weights to the input type, which does nothing in fp32,
+    # the layers are turned back into nn.Linear so quantize_dynamic recognises them
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+"""
+    Sets the number of torch threads of the current process
+
+    Parameters:
+    threads (int, optional): Number of threads used inside an operation. Defaults to None (torch default).
+    interop_threads (int, optional): Number of threads running independent operations. Defaults to None (torch default).
+"""
+def set_threads(threads=None, interop_threads=None):
+    if threads is not None:
+        torch.set_num_threads(threads)
+    if interop_threads is not None:
+        torch.set_num_interop_threads(interop_threads)
+
+
+"""
+    Returns the time counters of a run, in seconds
+
+    Returns:
+    dict: Seconds of audio transcribed and seconds spent in every stage
+"""
+def new_stats():
+    return {"audio": 0.0, "decode": 0.0, "inference": 0.0, "lemmatization": 0.0, "checkpoint": 0.0}
+
+
+"""
+    Builds the options given to model.transcribe
+
+    Parameters:
+    language (str, optional): Language of the audio, skips the language detection. Defaults to None (detected).
+
+    Returns:
+    dict: The decoding options
+"""
+def decode_options(language=None):
+    options = dict(DECODE_OPTIONS)
+    if language is not None:
+        options['language'] = language
+    return options
+
+
+"""
+    Builds the record saved in the output file
+
+    Parameters:
+    file (str): Path of the audio file
+    text (str): Text of the transcript
+    lemmas (list): Lemmas of the text
+    named_entities (list): Named entities of the text
+
+    Returns:
+    dict: The transcript record of the file
+"""
+def make_record(file, text, lemmas, named_entities):
+    return {
+        "file": file,
+        "text": text,
+        "lemmas": lemmas,
+        "named_entities": named_entities
+    }
+
+
+"""
+    Reads the cache then decodes the audio file to a 16 kHz array if it is not cached
+
+    Parameters:
+    file (str): Path of the audio file
+    cache (TranscriptCache, optional): Cache checked before decoding the audio. Defaults to None.
+
+    Returns:
+    tuple: (key, cached, audio), the cache key, the cached transcript or None and the audio or None if cached
+"""
+def load_file(file, cache=None):
+    key = None
+    if cache is not None:
+        # Skipping whisper if the same audio was already transcribed with the same settings
+        key = cache.key(file)
+        cached = cache.get(key)
+        if cached is not None:
+            return key, cached, None
+    return key, None, whisper.load_audio(file)
+
+
+"""
+    Saves a new transcript in the cache, a failure such as a database locked by other workers is only reported
+    so the transcript is still saved in the output file
+
+    Parameters:
+    cache (TranscriptCache): Cache receiving the transcript
+    key (str): Key of the audio file
+    file (str): Path of the audio file
+    text (str): Text of the transcript
+    segments (list): Segments returned by whisper
+    lemmas (list): Lemmas of the text
+    named_entities (list): Named entities of the text
+"""
+def cache_put(cache, key, file, text, segments, lemmas, named_entities):
+    try:
+        cache.put(key, text, segments, lemmas, named_entities)
+    except Exception as error:
+        print(f"\n[!] Could not cache {file} : {error}")
+
+
+"""
+    Transcribes an audio file loaded by load_file and builds the record saved in the output file
+
+    Parameters:
+    model: Loaded whisper model
+    lemmatisor (Lemmatizor): Lemmatizor used to extract lemmas and named entities
+    file (str): Path of the audio file
+    loaded (tuple): Value returned by load_file
+    options (dict, optional): Options given to model.transcribe. Defaults to DECODE_OPTIONS.
+    cache (TranscriptCache, optional): Cache receiving the new transcript. Defaults to None.
+    stats (dict, optional): Counters from new_stats, increased with the time spent. Defaults to None.
+
+    Returns:
+    dict: The transcript record of the file
+"""
+def transcribe_loaded(model, lemmatisor, file, loaded, options=DECODE_OPTIONS, cache=None, stats=None):
+    key, cached, audio = loaded
+    if cached is not None:
+        return make_record(file, cached['text'], cached['lemmas'], cached['named_entities'])
+    # Getting the transcription result from the model
+    start = time.perf_counter()
+    result = model.transcribe(audio, **options)
+    if stats is not None:
+        stats['inference'] += time.perf_counter() - start
+        stats['audio'] += len(audio) / whisper.audio.SAMPLE_RATE
+    # Processing the text using the Lemmatizor class
+    start = time.perf_counter()
+    lemmatisor.process(result['text'])
+    record = make_record(file, result['text'], lemmatisor.get_lemmas(), lemmatisor.get_named_entities())
+    if stats is not None:
+        stats['lemmatization'] += time.perf_counter() - start
+    if cache is not None:
+        cache_put(cache, key, file, result['text'], result['segments'], record['lemmas'], record['named_entities'])
+    return record
+
+
+"""
+    Transcribes one audio file and builds the record saved in the output file
+
+    Parameters:
+    model: Loaded whisper model
+    lemmatisor (Lemmatizor): Lemmatizor used to extract lemmas and named entities
+    file (str): Path of the audio file to transcribe
+    options (dict, optional): Options given to model.transcribe. Defaults to DECODE_OPTIONS.
+    cache (TranscriptCache, optional): Cache checked before running whisper. Defaults to None.
+    stats (dict, optional): Counters from new_stats, increased with the time spent. Defaults to None.
+
+    Returns:
+    dict: The transcript record of the file
+"""
+def transcribe_file(model, lemmatisor, file, options=DECODE_OPTIONS, cache=None, stats=None):
+    start = time.perf_counter()
+    loaded = load_file(file, cache)
+    if stats is not None:
+        stats['decode'] += time.perf_counter() - start
+    return transcribe_loaded(model, lemmatisor, file, loaded, options, cache, stats)
 
 
 # STTBrain class to process and save the transcription results
@@ -13,47 +210,126 @@ class STTBrain:
 
         Parameters:
         file_list (list): List of files to be processed
-        output_file (str): File to save the processing results
+        output_file (str): File to save the processing results, a .jsonl file is appended to after every file
         model (str, optional): Model name to use for transcribing the audio. Defaults to 'base'.
         processed (list, optional): List of already processed files. Defaults to [].
+        workers (int, optional): Number of worker processes, 1 keeps everything in this process. Defaults to 1.
+        pipeline (bool, optional): Runs audio decoding, whisper and lemmatization as separate stages. Defaults to False.
+        batch_size (int, optional): Number of transcripts lemmatized at once in pipeline mode. Defaults to 8.
+        cache (str, optional): Path of the SQLite transcript cache, None disables the cache. Defaults to None.
+        cache_size (int, optional): Maximum number of transcripts kept in the cache. Defaults to 50000.
+        prefetch (int, optional): Number of audio files decoded in advance by a thread pool. Defaults to 2.
+        prefetch_memory (int, optional): Maximum size in MB of the decoded audio waiting for whisper. Defaults to 2048.
+        quantize (bool, optional): Quantizes the linear layers of the model to int8 for CPU inference. Defaults to False.
+        threads (int, optional): Torch threads per process, defaults to the cores shared between the workers.
+        interop_threads (int, optional): Torch inter-op threads per process. Defaults to None (torch default).
+        language (str, optional): Language of the audio, skips the language detection. Defaults to None (detected).
+        window_batch (int, optional): Number of 30 seconds windows of different files decoded at once,
+            0 transcribes the files one by one with model.transcribe. Defaults to 0.
+        model_loader (function, optional): Function loading the model from its name, must be picklable
+            to be sent to the workers. Defaults to None (whisper.load_model).
     """
-    def __init__(self, file_list, output_file, model='base', processed=[]):
+    def __init__(self, file_list, output_file, model='base', processed=[], workers=1, pipeline=False, batch_size=8,
+                 cache=None, cache_size=50000, prefetch=2, prefetch_memory=2048, quantize=False, threads=None,
+                 interop_threads=None, language=None, window_batch=0, model_loader=None):
         # List of files to be processed
         self.file_list = file_list
         # File to save the processing results
         self.output_file = output_file
-        # Loading the whisper model
-        self.model = whisper.load_model(model)
-        # Initializing the Lemmatizor class
-        self.lemmatisor = Lemmatizor()
+        # Name of the whisper model, needed by the worker processes
+        self.model_name = model
+        # Number of worker processes
+        self.workers = workers
+        # Pipeline mode and number of transcripts lemmatized at once
+        self.pipeline = pipeline
+        self.batch_size = batch_size
+        # Number of windows decoded at once in batched mode
+        self.window_batch = window_batch
+        # Number of files and memory budget of the audio decoded in advance
+        self.prefetch = prefetch
+        self.prefetch_memory = prefetch_memory
+        # CPU settings, the cores are shared between the workers by default
+        self.quantize = quantize
+        self.threads = threads if threads is not None or workers <= 1 else max(1, (cpu_count() or 1) // workers)
+        self.interop_threads = interop_threads
+        # Options given to model.transcribe
+        self.options = decode_options(language)
+        # Transcript cache, every worker process opens its own connection
+        # The quantized model gives different transcripts so it has its own entries
+        self.cache_model = f'{model}-int8' if quantize else model
+        self.cache_path = cache
+        self.cache_size = cache_size
+        self.cache = None
+        if cache and workers <= 1:
+            self.cache = TranscriptCache(cache, self.cache_model, self.options, cache_size)
+        # Seconds of audio transcribed and seconds spent in every stage, the lock protects them from the threads
+        self.stats = new_stats()
+        self.lock = Lock()
+        # Loading the whisper model and the Lemmatizor only when running in this process,
+        # every worker process loads its own copy
+        if workers <= 1:
+            set_threads(threads, interop_threads)
+        self.model_loader = model_loader
+        self.model = load_model(model, quantize, model_loader) if workers <= 1 else None
+        self.lemmatisor = Lemmatizor() if workers <= 1 else None
         # List of already processed files
-        self.results = processed
+        self.processed = processed
+        # Results waiting to be saved in the legacy JSON output
+        self.results = []
+        # JSONL outputs are appended to record by record instead of rewritten
+        self.writer = JSONLWriter(output_file) if output_file.endswith('.jsonl') else None
 
     """
         Starts the processing of the files and saves the results
     """
     def run(self):
+        start = time.perf_counter()
+        if self.workers > 1:
+            self._run_parallel()
+        elif self.window_batch > 0:
+            self._run_batched()
+        elif self.pipeline:
+            self._run_pipelined()
+        else:
+            self._run_serial()
+        if self.writer is not None:
+            self.writer.close()
+        self.report(time.perf_counter() - start)
+
+    """
+        Prints the real-time factor of the run, the time spent per second of audio
+
+        Parameters:
+        duration (float): Duration of the whole run in seconds
+    """
+    def report(self, duration):
+        if self.stats['audio'] == 0:
+            return
+        mode = [self.model_name, 'int8' if self.quantize else 'fp32', f"language {self.options.get('language', 'detected')}",
+                f'{self.workers} worker(s)', f"{self.threads or 'default'} thread(s)"]
+        print(f"[-] Mode : {', '.join(mode)}")
+        print(f"[-] {self.stats['audio']:.0f}s of audio, inference real-time factor "
+              f"{self.stats['inference'] / self.stats['audio']:.3f}, overall real-time factor "
+              f"{duration / self.stats['audio']:.3f}")
+
+    """
+        Processes the files one after the other in this process
+    """
+    def _run_serial(self):
         # Variable to keep track of processed files
         index = 0
         # Using a progress bar to show the processing status
         with Bar('Processing', max=len(self.file_list)) as bar:
-            for file in self.file_list:
+            # The next files are decoded while the current one is transcribed
+            for file, loaded, error in self._prefetcher():
                 # Increasing the processed file counter
                 index += 1
-                # Getting the transcription result from the model
-                result = self.model.transcribe(file, fp16=False)
-                # Processing the text using the Lemmatizor class
-                self.lemmatisor.process(result['text'])
-                # Adding the result to the list of results
-                self.results.append({
-                    "file": file,
-                    "text": result['text'],
-                    "lemmas": self.lemmatisor.get_lemmas(),
-                    "named_entities": self.lemmatisor.get_named_entities()
-                })
-                # Saving progress every 10 processed files in case recovery is needed
-                if index % 10 == 0:
-                    self.save_progress()
+                if error is not None:
+                    print(f"\n[!] Could not decode {file} : {error}")
+                else:
+                    # Saving the result
+                    self.add_result(transcribe_loaded(self.model, self.lemmatisor, file, loaded, self.options,
+                                                      self.cache, self.stats), index)
                 # Updating the progress bar
                 bar.next()
             # Finishing the progress bar
@@ -61,10 +337,258 @@ class STTBrain:
             # Saving the final results
             self.save_progress()
 
+    """
+        Processes the files with the BatchTranscriber, windows of consecutive files are decoded together
+    """
+    def _run_batched(self):
+        transcriber = BatchTranscriber(self.model, self.window_batch, self.options)
+        index = 0
+        with Bar('Processing', max=len(self.file_list)) as bar:
+            for file, result, (loaded, error) in transcriber.transcribe(self._batch_items()):
+                index += 1
+                if error is not None:
+                    print(f"\n[!] Could not decode {file} : {error}")
+                elif result is None:
+                    # Coming from the cache
+                    cached = loaded[1]
+                    self.add_result(make_record(file, cached['text'], cached['lemmas'], cached['named_entities']),
+                                    index)
+                else:
+                    start = time.perf_counter()
+                    self.lemmatisor.process(result['text'])
+                    record = make_record(file, result['text'], self.lemmatisor.get_lemmas(),
+                                         self.lemmatisor.get_named_entities())
+                    self.stats['lemmatization'] += time.perf_counter() - start
+                    if self.cache is not None:
+                        cache_put(self.cache, loaded[0], file, result['text'], result['segments'], record['lemmas'],
+                                  record['named_entities'])
+                    self.add_result(record, index)
+                bar.next()
+            bar.finish()
+            # Saving the final results
+            self.save_progress()
+        self.stats['inference'] += transcriber.inference_time
+
+    """
+        Returns the items given to the BatchTranscriber, cached or undecodable files have no audio
+
+        Returns:
+        generator: (file, audio, (loaded, error)) tuples
+    """
+    def _batch_items(self):
+        for file, loaded, error in self._prefetcher():
+            audio = loaded[2] if error is None else None
+            if audio is not None:
+                with self.lock:
+                    self.stats['audio'] += len(audio) / whisper.audio.SAMPLE_RATE
+            yield file, audio, (loaded, error)
+
+    """
+        Returns the AudioPrefetcher reading the cache and decoding the files to process
+    """
+    def _prefetcher(self):
+        return AudioPrefetcher(self.file_list, self._load, self.prefetch, self.prefetch_memory * 1024 ** 2)
+
+    """
+        Loads a file with load_file from the prefetch threads, counting the decoding time
+    """
+    def _load(self, file):
+        start = time.perf_counter()
+        loaded = load_file(file, self.cache)
+        with self.lock:
+            self.stats['decode'] += time.perf_counter() - start
+        return loaded
+
+    """
+        Processes the files with three stages joined by bounded queues:
+        audio decoding and lemmatization run in their own threads so whisper never waits on them
+    """
+    def _run_pipelined(self):
+        # Bounded queues so a fast stage cannot fill the memory with decoded audio or texts
+        decoded = queue.Queue(maxsize=2)
+        transcribed = queue.Queue(maxsize=self.batch_size * 4)
+        decoder = Thread(target=self._decode_stage, args=(decoded, transcribed), daemon=True)
+        lemmatizer = Thread(target=self._lemmatize_stage, args=(transcribed,), daemon=True)
+        decoder.start()
+        lemmatizer.start()
+
+        # Whisper inference runs in this thread
+        try:
+            for file, key, audio in iter(decoded.get, None):
+                if audio is None:
+                    transcribed.put((file, key, None, False))
+                    continue
+                try:
+                    start = time.perf_counter()
+                    result = self.model.transcribe(audio, **self.options)
+                    with self.lock:
+                        self.stats['inference'] += time.perf_counter() - start
+                        self.stats['audio'] += len(audio) / whisper.audio.SAMPLE_RATE
+                    transcribed.put((file, key, result, False))
+                except Exception as error:
+                    print(f"\n[!] Could not process {file} : {error}")
+                    transcribed.put((file, key, None, False))
+        finally:
+            # Letting the lemmatization stage save what is left
+            transcribed.put(None)
+            lemmatizer.join()
+
+    """
+        First stage of the pipeline, decodes the audio files to 16 kHz arrays with the prefetcher
+
+        Parameters:
+        decoded (Queue): Queue receiving (file, key, audio) tuples, audio is None if the decoding failed
+        transcribed (Queue): Queue receiving the cached transcripts, which skip whisper
+    """
+    def _decode_stage(self, decoded, transcribed):
+        for file, loaded, error in self._prefetcher():
+            if error is not None:
+                print(f"\n[!] Could not decode {file} : {error}")
+                decoded.put((file, None, None))
+                continue
+            key, cached, audio = loaded
+            if cached is not None:
+                transcribed.put((file, key, cached, True))
+            else:
+                decoded.put((file, key, audio))
+        decoded.put(None)
+
+    """
+        Last stage of the pipeline, lemmatizes the transcripts by batches and saves them
+
+        Parameters:
+        transcribed (Queue): Queue of (file, key, result, cached) tuples, result is None if the transcription failed
+            and is already lemmatized when cached is True
+    """
+    def _lemmatize_stage(self, transcribed):
+        index = 0
+        finished = False
+        with Bar('Processing', max=len(self.file_list)) as bar:
+            while not finished:
+                # Waiting for one transcript then taking every transcript already available
+                batch = [transcribed.get()]
+                while batch[-1] is not None and len(batch) < self.batch_size:
+                    try:
+                        batch.append(transcribed.get_nowait())
+                    except queue.Empty:
+                        break
+                if batch[-1] is None:
+                    finished = True
+                    batch.pop()
+
+                # Errors are reported by batch so this stage keeps draining the queue, a stopped consumer would
+                # block the inference loop on the bounded queue
+                try:
+                    index = self._lemmatize_batch(batch, index)
+                except Exception as error:
+                    files = ', '.join(file for file, _, _, _ in batch)
+                    print(f"\n[!] Could not process {files} : {error}")
+                for _ in batch:
+                    bar.next()
+            bar.finish()
+            # Saving the final results
+            self.save_progress()
+
+    """
+        Lemmatizes a batch of transcripts of the pipeline and saves them
+
+        Parameters:
+        batch (list): (file, key, result, cached) tuples taken from the transcribed queue
+        index (int): Number of results saved before this batch
+
+        Returns:
+        int: Number of results saved after this batch
+    """
+    def _lemmatize_batch(self, batch, index):
+        # Results coming from the cache are already lemmatized
+        for file, key, result, cached in batch:
+            if cached:
+                index += 1
+                self.add_result(make_record(file, result['text'], result['lemmas'], result['named_entities']), index)
+        results = [(file, key, result) for file, key, result, cached in batch if result is not None and not cached]
+        start = time.perf_counter()
+        nlp_results = list(self.lemmatisor.process_batch([result['text'] for _, _, result in results],
+                                                         self.batch_size))
+        with self.lock:
+            self.stats['lemmatization'] += time.perf_counter() - start
+        for (file, key, result), (lemmas, named_entities) in zip(results, nlp_results):
+            index += 1
+            self.add_result(make_record(file, result['text'], lemmas, named_entities), index)
+            if key is not None:
+                cache_put(self.cache, key, file, result['text'], result['segments'], lemmas, named_entities)
+        return index
+
+    """
+        Processes the files with a pool of STTWorker processes, results are saved by this process
+    """
+    def _run_parallel(self):
+        tasks = Queue()
+        results = Queue()
+        workers = [STTWorker(tasks, results, self.model_name, self.threads, self.options, self.cache_path,
+                             self.cache_size, self.quantize, self.interop_threads, self.cache_model,
+                             self.model_loader)
+                   for _ in range(self.workers)]
+        for worker in workers:
+            worker.start()
+        # Filling the shared queue, one None per worker to stop them at the end
+        for file in self.file_list:
+            tasks.put(file)
+        for _ in workers:
+            tasks.put(None)
+
+        index = 0
+        with Bar('Processing', max=len(self.file_list)) as bar:
+            while index < len(self.file_list):
+                try:
+                    result = results.get(timeout=5)
+                except queue.Empty:
+                    # Stopping if every worker died before sending all the results
+                    if not any(worker.is_alive() for worker in workers):
+                        print('\n[!] All workers stopped before the end')
+                        break
+                    continue
+                index += 1
+                if 'error' in result:
+                    print(f"\n[!] Could not process {result['file']} : {result['error']}")
+                else:
+                    for name, value in result['stats'].items():
+                        self.stats[name] += value
+                    self.add_result(result['record'], index)
+                bar.next()
+            bar.finish()
+            # Saving the final results
+            self.save_progress()
+
+        for worker in workers:
+            worker.join()
+
+    """
+        Saves a transcript record, right away for a JSONL output or every 10 files for a JSON output
+
+        Parameters:
+        record (dict): The transcript record
+        index (int): Number of files processed so far
+    """
+    def add_result(self, record, index):
+        if self.writer is not None:
+            start = time.perf_counter()
+            self.writer.write(record)
+            with self.lock:
+                self.stats['checkpoint'] += time.perf_counter() - start
+            return
+        self.results.append(record)
+        # Saving progress every 10 processed files in case recovery is needed
+        if index % 10 == 0:
+            self.save_progress()
+
     """
         Saves the current processing results to the output file
     """
     def save_progress(self):
+        # JSONL records are already on the disk
+        if self.writer is not None:
+            return
+        start = time.perf_counter()
         # Checking if the output file exists
         if not path.exists(self.output_file):
             # Initializing an empty list if the file does not exist
@@ -82,48 +606,69 @@ class STTBrain:
 
         # Clearing the results list
         self.results = []
+        with self.lock:
+            self.stats['checkpoint'] += time.perf_counter() - start
 
-# STTWorker class to process the files using multiple threads
-class STTWorker(Thread):
-    # class variable to store the results of STT
-    results = []
-
+# STTWorker class to process the files in a separate process
+class STTWorker(Process):
     """
-        Initialize the class with a list of files and a model name.
+        Initialize the worker with the queues shared with the STTBrain.
 
-        :param file_list: list of audio files to transcribe.
+        :param tasks: queue of audio files to transcribe, None stops the worker.
+        :param results: queue receiving the transcript records and their stats.
         :param model: name of the model to use for transcription. Default is "base".
+        :param threads: number of torch threads used by the worker. Default is None (torch default).
+        :param options: options given to model.transcribe. Default is DECODE_OPTIONS.
+        :param cache: path of the SQLite transcript cache, None disables the cache. Default is None.
+        :param cache_size: maximum number of transcripts kept in the cache. Default is 50000.
+        :param quantize: quantizes the linear layers of the model to int8. Default is False.
+        :param interop_threads: number of torch inter-op threads used by the worker. Default is None (torch default).
+        :param cache_model: model name used in the cache key. Default is None (model).
+        :param model_loader: function loading the model from its name. Default is None (whisper.load_model).
     """
-    def __init__(self, file_list, model="base"):
+    def __init__(self, tasks, results, model="base", threads=None, options=DECODE_OPTIONS, cache=None,
+                 cache_size=50000, quantize=False, interop_threads=None, cache_model=None, model_loader=None):
 
-        # Call the parent class constructor
-        Thread.__init__(self)
+        # Call the parent class constructor, workers die with the main process
+        Process.__init__(self, daemon=True)
 
-        # initialize the file list and model name
-        self.file_list = file_list
-        self.model = whisper.load_model(model)
-        self.lemmatisor = Lemmatizor()
+        # initialize the queues and the model name, the model itself is loaded in the worker process
+        self.tasks = tasks
+        self.results = results
+        self.model_name = model
+        self.threads = threads
+        self.options = options
+        self.cache_path = cache
+        self.cache_size = cache_size
+        self.quantize = quantize
+        self.interop_threads = interop_threads
+        self.cache_model = cache_model or model
+        self.model_loader = model_loader
 
     """
-        Perform the speech to text transcription for each file in the file list.
+        Load the model once then transcribe files from the task queue until None is received.
 
         :return: None
     """
     def run(self):
 
-        # Loop over the files in the file list
-        for file in self.file_list:
-            # Transcribe the audio in the file using the STT model
-            result = self.model.transcribe(file)
-            # Process the result text
-            self.lemmatisor.process(result['text'])
-            # Append the result to the class variable results
-            STTWorker.results.append({
-                "file": file,
-                "text": result['text'],
-                "lemmas": self.lemmatisor.get_lemmas(),
-                "named_entities": self.lemmatisor.get_named_entities()
-            })
+        # Limiting the torch threads so the workers don't fight over the cores
+        set_threads(self.threads, self.interop_threads)
+        model = load_model(self.model_name, self.quantize, self.model_loader)
+        lemmatisor = Lemmatizor()
+        cache = None
+        if self.cache_path:
+            cache = TranscriptCache(self.cache_path, self.cache_model, self.options, self.cache_size)
+
+        # Loop over the files sent by the STTBrain
+        for file in iter(self.tasks.get, None):
+            try:
+                stats = new_stats()
+                record = transcribe_file(model, lemmatisor, file, self.options, cache, stats)
+                self.results.put({"record": record, "stats": stats})
+            except Exception as error:
+                # Sending the error back so the file is not counted as processed
+                self.results.put({"file": file, "error": str(error)})
 
 if __name__ == "__main__":
     # Create an instance of the STTBrain with file list and number of workers
@@ -1,18 +1,110 @@
 #This script is used to extract all xml files in the database into one json file for easier processing
-#It will generate a json file containing every xml file contents
+#It will generate a json file containing every xml file contents, or a jsonl file with one xml file per line
+#With --projection only the given fields of each xml file are extracted
+#With --incremental only the xml files added or changed since the last run are parsed
+#With --database the broadcasts are also written in an indexed SQLite database
 import argparse
 import json
+import os
 import xmltodict
+from os import path
+from multiprocessing import Pool
 from progress.bar import Bar
 
+from src.file_manifest import FileManifest
+from src.metadata_store import MetadataStore, PATHS
 from src.path_finder import PathFinder, XMLPathFinder
+from src.projection import Projection, DEFAULT_PATHS
 
-def main(base_path, output):
-    """Main function to extract data from xml files and save it as a json file."""
+
+def parse_xml(xml_file):
+    """Converts an xml file to a python dictionary with the name of the file."""
+    with open(xml_file, 'r', encoding='UTF-8') as file:
+        # Read the content of the xml file
+        stringed_xml = file.read()
+    # Convert the xml content to python dictionary
+    temp_data = xmltodict.parse(stringed_xml)
+    # Add the xml file name to the dictionary
+    temp_data['file'] = xml_file
+    return temp_data
+
+
+def iter_records(output, chunk_size=1 << 20):
+    """Reads the records of a previous output one at a time, json or jsonl, so memory does not grow with its size."""
+    decoder = json.JSONDecoder()
+    with open(output, 'r', encoding='UTF-8') as file:
+        if output.endswith('.jsonl'):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        buffer = ''
+        position = 0
+        started = False
+        while True:
+            # Skipping the separators between the records
+            while position < len(buffer) and (buffer[position].isspace() or buffer[position] in ',]'
+                                              or (not started and buffer[position] == '[')):
+                started = started or buffer[position] == '['
+                position += 1
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+                yield record
+                continue
+            except ValueError:
+                pass
+            # The next record is not complete, reading more of the file
+            chunk = file.read(chunk_size)
+            buffer = buffer[position:] + chunk
+            position = 0
+            if not chunk:
+                if buffer.strip():
+                    raise ValueError(f'Incomplete record at the end of {output}')
+                return
+
+
+def merge_records(output, files, changed_records, new_records):
+    """
+    Yields (record, updated) for the records of a previous output followed by the new records.
+    Records of changed files are replaced by their new record and records of files not in files are dropped,
+    updated tells if the record was parsed by this run.
+    """
+    for record in iter_records(output):
+        xml_file = record['file']
+        if xml_file in changed_records:
+            yield changed_records.pop(xml_file), True
+        elif xml_file in files:
+            yield record, False
+    # Changed files missing from the previous output
+    for record in changed_records.values():
+        yield record, True
+    for record in new_records:
+        yield record, True
+
+
+def main(base_path, output, manifest=None, workers=1, chunk_size=64, projection=None, incremental=False,
+         database=None):
+    """
+    Main function to extract data from xml files and save it as a json file.
+    Records are written as soon as they are parsed, so only the chunks being parsed are kept in memory,
+    and the records of an incremental run are streamed from the previous output.
+    An output ending with .jsonl gets one record per line, otherwise a json list.
+
+    workers: number of processes parsing the xml files
+    chunk_size: number of xml files sent at once to a worker
+    projection: Projection extracting only some fields, the whole files are converted if None
+    incremental: keep the size, modification time and hash of the xml files in a manifest next to the output,
+        only new or changed files are parsed again and the records of deleted files are dropped,
+        a jsonl output is only appended to when no file changed nor was deleted, and it is written again from every
+        file when it no longer ends like it did after the last run; a run without it removes the manifest
+    database: path of a SQLite database also receiving one row per broadcast, only the rows of new, changed
+        or deleted files are written by an incremental run
+    """
 
     # Finding all folders
     print('[-] Searching for all folders')
-    finder = PathFinder(base_path) # Create an instance of PathFinder
+    finder = PathFinder(base_path, manifest) # Create an instance of PathFinder
     finder.run_finder() # Run the function to find the folders
     folders = finder.paths # Get the list of folders
 
@@ -23,33 +115,132 @@ def main(base_path, output):
     for xml_file in xml_finder.extract(): # Extract the xml files
         xml_files.append(xml_file) # Append the xml file to the list
 
+    # Finding the xml files changed since the last run
+    jsonl = output.endswith('.jsonl')
+    previous = False
+    known = {}
+    changed_files = []
+    new_files = xml_files
+    deleted_files = []
+    if incremental:
+        setting = {"paths": projection.paths, "shape": projection.shape} if projection else None
+        file_manifest = FileManifest(f'{output}.files.json', setting)
+        # An output which is not the one of the manifest is written again from every file
+        previous = file_manifest.load() and path.isfile(output) and (not jsonl or file_manifest.matches(output))
+        known = file_manifest.files if previous else {}
+        entries = {}
+        new_files = []
+        for xml_file in xml_files:
+            entries[xml_file], changed = file_manifest.check(xml_file)
+            if xml_file not in known:
+                new_files.append(xml_file)
+            elif changed:
+                changed_files.append(xml_file)
+        deleted_files = [xml_file for xml_file in known if xml_file not in entries]
+        print(f'[-] {len(new_files)} new files, {len(changed_files)} changed files, '
+              f'{len(deleted_files)} deleted files')
+    elif path.isfile(f'{output}.files.json'):
+        # The output is written again, the manifest of a previous incremental run no longer describes it
+        os.remove(f'{output}.files.json')
+
+    store = None
+    rebuild = False
+    if database:
+        store = MetadataStore(database)
+        # The store is only updated when it holds the rows of the previous run, otherwise it is filled again
+        rebuild = not previous or store.count() != len(known)
+        if rebuild:
+            store.clear()
+        for xml_file in deleted_files:
+            store.remove(xml_file)
+
     # Extracting data from xml files
     print('[-] Extracting data')
-    data = [] # Initialize an empty list to store the extracted data
-    with Bar('Processing', max=len(xml_files)) as bar: # Create a progress bar
-        for xml_file in xml_files:
-            with open(xml_file, 'r', encoding='UTF-8') as file:
-                # Read the content of the xml file
-                stringed_xml = file.read()
-                # Convert the xml content to python dictionary
-                temp_data = xmltodict.parse(stringed_xml)
-                # Add the xml file name to the dictionary
-                temp_data['file'] = xml_file
-                # Append the extracted data to the list
-                data.append(temp_data)
-            bar.next() # Move the bar to the next step
-        bar.finish() # Finish the bar
-
-    # Saving the extracted data as a json file
-    print('[-] Saving data')
-    with open(output, 'w+', encoding='UTF-8') as file:
-        # Write the extracted data to the json file
-        json.dump(data, file, ensure_ascii=False)
+    parse = projection.extract if projection else parse_xml
+    pool = None
+    if workers > 1 and (changed_files or new_files):
+        # Records come back in the order of the xml files
+        pool = Pool(workers)
+
+    def parse_files(files):
+        return pool.imap(parse, files, chunksize=chunk_size) if pool else map(parse, files)
+
+    # Only the records of the changed files are kept in memory until they replace the previous ones
+    changed_records = {record['file']: record for record in parse_files(changed_files)}
+
+    if jsonl and previous and not changed_files and not deleted_files and not rebuild:
+        # Nothing to replace, the new records are appended to the previous output
+        # after removing what an interrupted run may have appended
+        with open(output, 'r+b') as file, Bar('Processing', max=len(new_files)) as bar:
+            file.truncate(file_manifest.output_size)
+            file.seek(file_manifest.output_size)
+            for record in parse_files(new_files):
+                file.write((json.dumps(record, ensure_ascii=False) + '\n').encode('UTF-8'))
+                if store:
+                    store.add(record)
+                bar.next() # Move the bar to the next step
+            bar.finish() # Finish the bar
+    else:
+        if previous:
+            records = merge_records(output, entries, changed_records, parse_files(new_files))
+        else:
+            records = ((record, True) for record in parse_files(new_files))
+
+        # Writing through a temporary file so the previous output is kept until the new one is complete
+        temporary_file = f'{output}.tmp'
+        with open(temporary_file, 'w+', encoding='UTF-8') as file, Bar('Processing', max=len(xml_files)) as bar:
+            if not jsonl:
+                # Same content as a json.dump of the whole list
+                file.write('[')
+            for index, (record, updated) in enumerate(records):
+                if jsonl:
+                    file.write(json.dumps(record, ensure_ascii=False) + '\n')
+                else:
+                    file.write((', ' if index else '') + json.dumps(record, ensure_ascii=False))
+                if store and (rebuild or updated):
+                    store.add(record)
+                bar.next() # Move the bar to the next step
+            if not jsonl:
+                file.write(']')
+            bar.finish() # Finish the bar
+        os.replace(temporary_file, output)
+    if store:
+        store.commit()
+        store.close()
+
+    if pool:
+        pool.close()
+        pool.join()
+    if incremental:
+        # Saved after the output so an interrupted run parses the files again
+        file_manifest.save(entries, output if jsonl else None)
+    print('[-] Data saved')
+
 
 if __name__ == "__main__":
     # Parse the command line arguments
     parser = argparse.ArgumentParser(description='Generates metadata file')
     parser.add_argument('--base_path', help='Root path of the database', required=True)
-    parser.add_argument('--output', help='Output path of the json file', default='output.json')
+    parser.add_argument('--output', help='Output path of the json file, one record per line if it ends with .jsonl',
+                        default='output.json')
+    parser.add_argument('--manifest', help='Json file keeping the folder tree between runs', default=None)
+    parser.add_argument('--workers', help='Number of processes parsing the xml files', type=int, default=1)
+    parser.add_argument('--chunk_size', help='Number of xml files sent at once to a worker', type=int, default=64)
+    parser.add_argument('--projection', help='Extract only the fields given by --paths instead of the whole files',
+                        action='store_true')
+    parser.add_argument('--paths', help='Fields to extract in xmltodict notation, e.g. programme/category/#text',
+                        nargs='+', default=None)
+    parser.add_argument('--shape', help='flat: one key per path, compat: nested like xmltodict (used by analytics)',
+                        choices=['flat', 'compat'], default='compat')
+    parser.add_argument('--incremental', help='Only parse the xml files added or changed since the last run',
+                        action='store_true')
+    parser.add_argument('--database', help='SQLite database also receiving the broadcasts, with --projection the fields '
+                                           'it needs are added to the paths', default=None)
     args = parser.parse_args()
-    main(args.base_path, args.output)
+    projection = None
+    if args.projection or args.paths:
+        paths = args.paths or DEFAULT_PATHS
+        if args.database:
+            paths = paths + [path for path in PATHS if path not in paths]
+        projection = Projection(paths, args.shape)
+    main(args.base_path, args.output, args.manifest, args.workers, args.chunk_size, projection, args.incremental, args.database)
@@ -0,0 +1 @@
+from .main import FileManifest
\ No newline at end of file
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+from os import path
+
+
+class FileManifest:
+    """
+    A class keeping the size, modification time and content hash of every xml file extracted,
+    so a later run only parses the new or changed files.
+    """
+
+    """
+        Initialize the FileManifest object with the path of the manifest and the setting of the extraction,
+        a manifest saved with another setting is ignored.
+    """
+    def __init__(self, manifest, setting=None):
+        self.manifest = manifest
+        self.setting = setting
+        self.files = {}
+        # Size of the output written with the manifest, where an interrupted append is cut,
+        # and hash of its last line telling whether the output is still the one of the manifest
+        self.output_size = None
+        self.output_hash = None
+
+    """
+        Loads the files saved by a previous run, returns False if there is no usable manifest.
+    """
+    def load(self):
+        if not path.isfile(self.manifest):
+            return False
+        with open(self.manifest, 'r', encoding='UTF-8') as file:
+            content = json.load(file)
+        if content.get('setting') != self.setting:
+            return False
+        self.files = content['files']
+        self.output_size = content.get('output_size')
+        self.output_hash = content.get('output_hash')
+        return True
+
+    """
+        A helper function that returns the hash of the content of a file.
+    """
+    def _hash(self, xml_file):
+        digest = hashlib.sha256()
+        with open(xml_file, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    """
+        Returns the entry of a file and whether it changed since the manifest was saved.
+        The content is only hashed when the size or the modification time changed.
+    """
+    def check(self, xml_file):
+        stat = os.stat(xml_file)
+        known = self.files.get(xml_file)
+        if known is not None and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known, False
+        content_hash = self._hash(xml_file)
+        entry = [stat.st_size, stat.st_mtime_ns, content_hash]
+        return entry, known is None or known[2] != content_hash
+
+    """
+        A helper function that returns the hash of the last line of a file cut at a size,
+        the file being read backwards from there.
+    """
+    def _tail_hash(self, output, size):
+        tail = b''
+        with open(output, 'rb') as file:
+            end = size
+            # Reading blocks until the newline ending the line before the last one
+            while end > 0 and b'\n' not in tail[:-1]:
+                start = max(end - (1 << 16), 0)
+                file.seek(start)
+                tail = file.read(end - start) + tail
+                end = start
+        return hashlib.sha256(tail[tail.rfind(b'\n', 0, max(len(tail) - 1, 0)) + 1:]).hexdigest()
+
+    """
+        Returns whether an output still starts with what it held when the manifest was saved, so it can be appended to:
+        it is at least as large and the line ending there is unchanged.
+        Its modification time is not compared as an interrupted append changes it.
+    """
+    def matches(self, output):
+        if self.output_size is None or self.output_hash is None or not path.isfile(output) \
+                or path.getsize(output) < self.output_size:
+            return False
+        return self._tail_hash(output, self.output_size) == self.output_hash
+
+    """
+        Saves the entries of the files through a temporary file, the files not given are dropped.
+        The size and the hash of the last line of the output are saved with them when it is given.
+    """
+    def save(self, files, output=None):
+        self.files = files
+        self.output_size = path.getsize(output) if output else None
+        self.output_hash = self._tail_hash(output, self.output_size) if output else None
+        temporary_file = f'{self.manifest}.tmp'
+        with open(temporary_file, 'w', encoding='UTF-8') as file:
+            json.dump({"setting": self.setting, "files": files, "output_size": self.output_size,
+                       "output_hash": self.output_hash}, file, ensure_ascii=False)
+        os.replace(temporary_file, self.manifest)
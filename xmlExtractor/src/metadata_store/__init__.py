@@ -0,0 +1 @@
+from .main import MetadataStore, PATHS
\ No newline at end of file
@@ -0,0 +1,139 @@
+import os
+import sqlite3
+
+
+# Fields read from the records, in xmltodict notation
+PATHS = ['programme/@channel', 'programme/@start', 'programme/category/#text', 'programme/title', 'programme/desc']
+
+
+class MetadataStore:
+    """
+        SQLite database of the broadcasts, one row per xml file keyed by its folder,
+        so other tools can fetch the rows they need with indexed queries instead of loading the whole metadata.
+
+        :param db_path: Path of the SQLite database, created if it does not exist.
+    """
+    def __init__(self, db_path):
+        self.connection = sqlite3.connect(db_path, timeout=60)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS broadcasts (
+                folder TEXT PRIMARY KEY,
+                channel TEXT,
+                category TEXT,
+                date TEXT,
+                hour TEXT,
+                title TEXT,
+                desc TEXT,
+                file TEXT
+            )
+        ''')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS broadcasts_channel ON broadcasts (channel)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS broadcasts_category ON broadcasts (category)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS broadcasts_date ON broadcasts (date, hour)')
+        self.connection.commit()
+
+    """
+        Returns a field of a record, either nested like xmltodict or flat with one key per path.
+
+        :param record: Record of an xml file.
+        :param path: Path of the field in xmltodict notation.
+        :return: The value of the field, None if it is missing.
+    """
+    def _get(self, record, path):
+        if path in record:
+            return record[path]
+        value = record
+        for segment in path.split('/'):
+            if not isinstance(value, dict) or segment not in value:
+                return None
+            value = value[segment]
+        return value
+
+    """
+        Returns the text of an element converted by xmltodict, the first one if it is repeated.
+
+        :param value: A string, a dict with the text under '#text' or a list of those.
+        :return: The text, None if there is none.
+    """
+    def _text(self, value):
+        if isinstance(value, list):
+            value = value[0] if value else None
+        if isinstance(value, dict):
+            value = value.get('#text')
+        return value
+
+    """
+        Returns the key of the broadcast of an xml file, its folder normalized the way Analytics does it.
+
+        :param xml_file: Path of the xml file.
+        :return: The folder.
+    """
+    def _folder(self, xml_file):
+        return os.sep.join(os.path.normpath(xml_file).split(os.sep)[:-1])
+
+    """
+        Converts a record to a row of the broadcasts table.
+        The date and hour come from the start of the programme ('YYYYMMDDHHMMSS +zzzz'),
+        or from the name of the folder ('YYYYMMDD_HHMM') when it is missing.
+        A category given several times is stored as NULL, as Analytics does not count it.
+
+        :param record: Record of an xml file, nested like xmltodict or flat.
+        :return: The row as a tuple.
+    """
+    def row(self, record):
+        folder = self._folder(record['file'])
+        start = self._get(record, 'programme/@start')
+        if start and len(start) >= 12 and start[:12].isdigit():
+            day, hour = start[:8], start[8:12]
+        else:
+            name = os.path.basename(folder)
+            day = name[:8]
+            hour = name.split('_')[1][:4] if '_' in name else None
+        category = self._get(record, 'programme/category/#text')
+        if isinstance(category, list):
+            category = None
+        return (folder, self._get(record, 'programme/@channel'), category, day, hour,
+                self._text(self._get(record, 'programme/title')), self._text(self._get(record, 'programme/desc')),
+                record['file'])
+
+    """
+        Removes every broadcast, the rows added afterwards replace them once commit() is called,
+        readers see the previous content until then.
+    """
+    def clear(self):
+        self.connection.execute('DELETE FROM broadcasts')
+
+    """
+        Adds the broadcast of a record, replacing the one of the same folder.
+
+        :param record: Record of an xml file, nested like xmltodict or flat.
+    """
+    def add(self, record):
+        self.connection.execute('INSERT OR REPLACE INTO broadcasts VALUES (?, ?, ?, ?, ?, ?, ?, ?)', self.row(record))
+
+    """
+        Removes the broadcast of a deleted xml file.
+
+        :param xml_file: Path of the xml file.
+    """
+    def remove(self, xml_file):
+        self.connection.execute('DELETE FROM broadcasts WHERE folder = ?', (self._folder(xml_file),))
+
+    """
+        Returns the number of broadcasts.
+    """
+    def count(self):
+        return self.connection.execute('SELECT COUNT(*) FROM broadcasts').fetchone()[0]
+
+    """
+        Commits the broadcasts added.
+    """
+    def commit(self):
+        self.connection.commit()
+
+    """
+        Closes the database.
+    """
+    def close(self):
+        self.connection.close()
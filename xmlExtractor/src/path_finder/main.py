@@ -1,4 +1,6 @@
-from os import listdir, path
+import json
+import os
+from os import path, scandir
 import xml.etree.ElementTree as ET
 
 
@@ -8,41 +10,75 @@ class PathFinder:
     """
 
     """
-        Initialize the PathFinder object with a base path.
+        Initialize the PathFinder object with a base path and an optional json manifest
+        keeping the folder tree between runs.
     """
-    def __init__(self, base_path):
+    def __init__(self, base_path, manifest=None):
         self.base_path = base_path
         self.paths = set()
+        self.manifest = manifest
 
     """
-        A helper function that returns a set of subdirectories within a given folder.
+        A helper function that returns the subdirectories of a folder, using the types given by scandir.
     """
-    def _list_dirs(self, current_folder, folders_and_files):
+    def _list_dirs(self, current_folder):
 
-        folders = set()
-        for element in folders_and_files:
-            current_path = path.join(current_folder, element)
-            if path.isdir(current_path):
-                folders.add(current_path)
+        folders = []
+        with scandir(current_folder) as elements:
+            for element in elements:
+                if element.is_dir():
+                    folders.append(element.path)
 
         return folders
 
+    """
+        Loads the folders saved in the manifest by a previous run from the same base path.
+    """
+    def _load_manifest(self):
+        if self.manifest is None or not path.isfile(self.manifest):
+            return {}
+        with open(self.manifest, 'r', encoding='UTF-8') as file:
+            content = json.load(file)
+        if content.get('base_path') != self.base_path:
+            return {}
+        return content['folders']
+
+    """
+        Saves the folder tree in the manifest through a temporary file.
+    """
+    def _save_manifest(self, folders):
+        temporary_file = f'{self.manifest}.tmp'
+        with open(temporary_file, 'w', encoding='UTF-8') as file:
+            json.dump({"base_path": self.base_path, "folders": folders}, file, ensure_ascii=False)
+        os.replace(temporary_file, self.manifest)
+
     """
         A function that finds all subdirectories under the base path or a given starting point.
+        Folders whose modification time did not change since the manifest was saved are not listed again.
     """
     def run_finder(self, starting_point=None):
         if starting_point is None:
             starting_point = self.base_path
 
-        folders = self._list_dirs(starting_point, listdir(starting_point))
+        known_folders = self._load_manifest()
+        folders = {}
+        to_visit = [starting_point]
+        while to_visit:
+            current_folder = to_visit.pop()
+            modification_time = os.stat(current_folder).st_mtime_ns
+            known = known_folders.get(current_folder)
+            if known is not None and known[0] == modification_time:
+                subfolders = known[1]
+            else:
+                subfolders = self._list_dirs(current_folder)
+            folders[current_folder] = [modification_time, subfolders]
 
-        if len(folders) == 0:
-            self.paths.add(starting_point)
-            return
+            if len(subfolders) == 0:
+                self.paths.add(current_folder)
+            to_visit.extend(subfolders)
 
-        for folder in folders:
-            next_path = path.join(starting_point, folder)
-            self.run_finder(starting_point=next_path)
+        if self.manifest is not None:
+            self._save_manifest(folders)
 
 
 class XMLPathFinder:
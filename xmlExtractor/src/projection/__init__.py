@@ -0,0 +1 @@
+from .main import Projection, DEFAULT_PATHS
\ No newline at end of file
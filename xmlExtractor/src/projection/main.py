@@ -0,0 +1,128 @@
+import xml.etree.ElementTree as ET
+
+
+# Fields read by Analytics (channel, category) and TextExtractor (desc, sub-title)
+DEFAULT_PATHS = ['programme/@channel', 'programme/category/#text', 'programme/desc', 'programme/sub-title']
+
+
+class Projection:
+    """
+    A class for extracting only some fields of an xml file instead of converting the whole file.
+    Paths use the xmltodict notation: tags separated by '/', '@name' for an attribute
+    and '#text' for the text of an element, e.g. 'programme/category/#text'.
+    """
+
+    """
+        Initialize the Projection object with the list of paths to extract and the shape of the records:
+        'flat' gives one key per path, 'compat' gives the nested dictionaries xmltodict would give,
+        restricted to the paths.
+    """
+    def __init__(self, paths=None, shape='compat'):
+        if shape not in ('flat', 'compat'):
+            raise ValueError(f'Unknown shape: {shape}')
+        self.paths = list(paths or DEFAULT_PATHS)
+        self.shape = shape
+        self.segments = [path.strip('/').split('/') for path in self.paths]
+        # Tree of the segments, an empty dictionary keeps the whole element
+        self.tree = {}
+        for segments in self.segments:
+            node = self.tree
+            for segment in segments:
+                node = node.setdefault(segment, {})
+
+    """
+        A helper function that returns the text of an element the way xmltodict does:
+        the text and the tails of its children joined and stripped, None if empty.
+    """
+    def _text(self, element):
+        parts = [element.text or '']
+        parts.extend(child.tail or '' for child in element)
+        return ''.join(parts).strip() or None
+
+    """
+        A helper function that converts a whole element the way xmltodict does.
+    """
+    def _value(self, element):
+        value = {'@' + name: attribute for name, attribute in element.attrib.items()}
+        for child in element:
+            child_value = self._value(child)
+            if child.tag not in value:
+                value[child.tag] = child_value
+            elif isinstance(value[child.tag], list):
+                value[child.tag].append(child_value)
+            else:
+                # Repeated elements become a list
+                value[child.tag] = [value[child.tag], child_value]
+        text = self._text(element)
+        if text is not None:
+            if not value:
+                return text
+            value['#text'] = text
+        return value or None
+
+    """
+        A helper function that converts an element restricted to a tree of segments.
+    """
+    def _project(self, element, tree):
+        if not tree:
+            return self._value(element)
+        if not element.attrib and len(element) == 0:
+            # xmltodict gives the text itself for an element without attributes nor children
+            return self._text(element) if '#text' in tree else None
+        value = {}
+        for segment, subtree in tree.items():
+            if segment.startswith('@'):
+                if segment[1:] in element.attrib:
+                    value[segment] = element.attrib[segment[1:]]
+            elif segment == '#text':
+                text = self._text(element)
+                if text is not None:
+                    value[segment] = text
+            else:
+                children = element.findall(segment)
+                if len(children) == 1:
+                    value[segment] = self._project(children[0], subtree)
+                elif children:
+                    value[segment] = [self._project(child, subtree) for child in children]
+        return value or None
+
+    """
+        A helper function that returns every value found at the end of the segments,
+        the text of the elements when the path ends with a tag.
+    """
+    def _find(self, element, segments):
+        segment, rest = segments[0], segments[1:]
+        if segment.startswith('@'):
+            return [element.attrib[segment[1:]]] if segment[1:] in element.attrib else []
+        if segment == '#text':
+            text = self._text(element)
+            return [text] if text is not None else []
+        values = []
+        for child in element.findall(segment):
+            if rest:
+                values.extend(self._find(child, rest))
+            else:
+                values.append(self._text(child))
+        return values
+
+    """
+        Parse an xml file and return the projected record with the name of the file.
+        A flat record has a value for each path found, a list if it was found several times.
+    """
+    def extract(self, xml_file):
+        root = ET.parse(xml_file).getroot()
+        record = {}
+        if self.shape == 'compat':
+            if root.tag in self.tree:
+                record[root.tag] = self._project(root, self.tree[root.tag])
+        else:
+            for path, segments in zip(self.paths, self.segments):
+                if segments[0] != root.tag:
+                    continue
+                values = self._find(root, segments[1:]) if len(segments) > 1 else [self._text(root)]
+                if len(values) == 1:
+                    record[path] = values[0]
+                elif values:
+                    record[path] = values
+        record['file'] = xml_file
+        return record